@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from app.db.database import get_db
-from app.services.enhanced_social_service import EnhancedSocialService
+from app.services.enhanced_social_service import EnhancedSocialService, encode_cursor, flush_activity_queue
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 import json
 
 router = APIRouter(prefix="/api/enhanced-social", tags=["enhanced-social"])
 
+@router.on_event("shutdown")
+async def flush_user_activity():
+    """Write buffered user activity before the process exits"""
+    await flush_activity_queue()
+
 class CreatePostRequest(BaseModel):
     content: str
     post_type: str = "general"
@@ -70,6 +76,7 @@ async def get_enhanced_feed(
     offset: int = Query(0, description="Number of posts to skip"),
     post_type: Optional[str] = Query(None, description="Filter by post type"),
     symbol: Optional[str] = Query(None, description="Filter by symbol"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (chronological feed)"),
     current_user: str = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -82,7 +89,8 @@ async def get_enhanced_feed(
             offset=offset,
             post_type=post_type,
             symbol=symbol,
-            algorithm=algorithm
+            algorithm=algorithm,
+            cursor=cursor
         )
         
         if "error" in result:
@@ -167,17 +175,24 @@ async def get_room_messages(
     room_id: int,
     limit: int = Query(50, description="Number of messages to return"),
     offset: int = Query(0, description="Number of messages to skip"),
+    before: Optional[str] = Query(None, description="next_cursor from the previous page"),
     current_user: str = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get messages for a chat room"""
     try:
         social_service = EnhancedSocialService(db)
-        messages = social_service.chat_manager.get_room_messages(room_id, limit, offset)
+        messages = social_service.chat_manager.get_room_messages(room_id, limit, offset, before)
+        
+        next_cursor = None
+        if messages and len(messages) == limit:
+            last = messages[-1]
+            next_cursor = encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"])
         
         return {
             "messages": messages,
-            "total_count": len(messages)
+            "total_count": len(messages),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -8,12 +8,19 @@ from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.services.historical_data_service import HistoricalDataService
 from typing import Optional
+from datetime import datetime
+import asyncio
 
 router = APIRouter(prefix="/api/historical", tags=["historical-data"])
 
 # Initialize service
 historical_service = HistoricalDataService()
 
+@router.on_event("shutdown")
+async def close_historical_service():
+    """Close the service's pooled HTTP and Redis connections"""
+    await historical_service.close()
+
 @router.get("/stocks/{symbol}")
 async def get_stock_historical_data(
     symbol: str,
@@ -50,19 +57,18 @@ async def get_historical_comparison(
     """Compare historical performance of multiple assets"""
     symbol_list = [s.strip().upper() for s in symbols.split(",")]
     
-    comparison_data = {}
+    # Determine which symbols are crypto and which are stocks
+    crypto_symbols = ["BTC", "ETH", "SOL", "ADA", "MATIC", "AVAX", "DOGE", "SHIB", "LINK", "UNI", "LTC"]
+    cryptos = [symbol for symbol in symbol_list if symbol in crypto_symbols]
+    stocks = [symbol for symbol in symbol_list if symbol not in crypto_symbols]
     
-    for symbol in symbol_list:
-        try:
-            # Determine if it's a stock or crypto
-            if symbol in ["BTC", "ETH", "SOL", "ADA", "MATIC", "AVAX", "DOGE", "SHIB", "LINK", "UNI", "LTC"]:
-                data = await historical_service.get_crypto_historical_data(symbol, days, interval)
-            else:
-                data = await historical_service.get_stock_historical_data(symbol, days, interval)
-            
-            comparison_data[symbol] = data
-        except Exception as e:
-            comparison_data[symbol] = {"error": str(e)}
+    # Fetch both groups concurrently
+    crypto_data, stock_data = await asyncio.gather(
+        historical_service.get_crypto_historical_batch(cryptos, days, interval),
+        historical_service.get_stocks_historical_batch(stocks, days, interval)
+    )
+    fetched = {**crypto_data, **stock_data}
+    comparison_data = {symbol: fetched[symbol] for symbol in symbol_list}
     
     return {
         "comparison": comparison_data,
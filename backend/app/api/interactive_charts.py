@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
@@ -48,7 +49,8 @@ async def get_chart_data(
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         
-        return result
+        # ohlcv_data holds NumPy arrays, which ORJSONResponse serializes natively
+        return ORJSONResponse(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
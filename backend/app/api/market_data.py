@@ -108,6 +108,19 @@ async def get_chart_data(
         "market_cap": base_price * 1000000000  # Mock market cap
     }
 
+@router.get("/price/{symbol}/summary")
+async def get_chart_summary(
+    symbol: str,
+    days: int = 30,
+    db: Session = Depends(get_db)
+):
+    """Get open/high/low/close and volume over a window without the bars"""
+    market_service = MarketDataService(db)
+    summary = market_service.get_chart_summary(symbol, days)
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No price data for {symbol}")
+    return summary
+
 @router.get("/market-status")
 async def get_market_status():
     """Get current market status (open/closed)"""
@@ -27,6 +27,10 @@ class ModelPredictionRequest(BaseModel):
     model_id: int
     input_data: Dict[str, Any]
 
+class BatchModelPredictionRequest(BaseModel):
+    model_id: int
+    input_data: List[Dict[str, Any]]
+
 @router.post("/train/price-prediction")
 async def train_price_prediction_model(
     request: PricePredictionTrainingRequest,
@@ -120,6 +124,29 @@ async def get_model_predictions(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/predict/batch")
+async def get_model_predictions_batch(
+    request: BatchModelPredictionRequest,
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get predictions for several inputs from a trained model in one pass."""
+    try:
+        service = MLTrainingService(db)
+        result = service.get_model_predictions_batch(
+            user_id=current_user,
+            model_id=request.model_id,
+            input_data_list=request.input_data
+        )
+        
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        
+        return result
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/models")
 async def get_user_models(
     current_user: str = Depends(get_current_user),
@@ -10,6 +10,18 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(minute='*/5', hour='9-16', day_of_week='1-5'),  # Every 5 min, 9-16, Mon-Fri
     },
     
+    # Precompute chart patterns for watched symbols on every 1-minute bar close
+    'precompute-chart-patterns': {
+        'task': 'app.tasks.market_data.precompute_chart_patterns',
+        'schedule': crontab(minute='*', hour='9-16', day_of_week='1-5'),  # Every minute, 9-16, Mon-Fri
+    },
+    
+    # Rebuild the latest-price rollup nightly to pick up any backfilled bars
+    'rebuild-latest-prices': {
+        'task': 'app.tasks.market_data.rebuild_latest_prices',
+        'schedule': crontab(hour=2, minute=0),  # 2 AM daily
+    },
+    
     # Update portfolio values every 15 minutes
     'update-portfolio-values': {
         'task': 'app.tasks.market_data.update_portfolio_values',
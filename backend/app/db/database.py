@@ -3,11 +3,15 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# Create database engine
+# Create database engine. Keep a warm pool of connections and hand out the
+# most recently used one first (LIFO) so idle extras can age out.
 engine = create_engine(
     settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
     pool_pre_ping=True,
-    pool_recycle=300,
+    pool_use_lifo=True,
+    pool_recycle=settings.db_pool_recycle,
     echo=settings.debug
 )
 
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, Numeric
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, Numeric, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
 
+# Native JSONB on PostgreSQL, generic JSON elsewhere (e.g. SQLite in tests)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class Asset(Base):
     __tablename__ = "assets"
     
@@ -22,6 +26,16 @@ class Asset(Base):
     prices = relationship("Price", back_populates="asset")
     transactions = relationship("Transaction", back_populates="asset")
     watchlist_items = relationship("Watchlist", back_populates="asset")
+    
+    # Trigram index so the substring ilike in asset search can use an index
+    # (PostgreSQL only, requires the pg_trgm extension)
+    __table_args__ = (
+        Index(
+            'idx_assets_symbol_name_trgm', 'symbol', 'name',
+            postgresql_using='gin',
+            postgresql_ops={'symbol': 'gin_trgm_ops', 'name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
 
 class Price(Base):
     __tablename__ = "prices"
@@ -39,12 +53,27 @@ class Price(Base):
     # Relationships
     asset = relationship("Asset", back_populates="prices")
     
-    # Indexes for time-series queries
+    # Indexes for time-series queries; the per-asset index is newest-first and
+    # covers close/volume so latest-bar lookups stay index-only
     __table_args__ = (
-        Index('idx_prices_asset_timestamp', 'asset_id', 'timestamp'),
+        Index(
+            'idx_prices_asset_timestamp_desc', 'asset_id', timestamp.desc(),
+            postgresql_include=['close_price', 'volume']
+        ),
         Index('idx_prices_timestamp', 'timestamp'),
     )
 
+# One row per asset: its newest bar and the close before it, kept current by
+# MarketDataService whenever prices are written
+class LatestPrice(Base):
+    __tablename__ = "latest_prices"
+    
+    asset_id = Column(Integer, ForeignKey("assets.id"), primary_key=True)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    close_price = Column(Float, nullable=False)
+    previous_close = Column(Float)
+    volume = Column(Float, nullable=False)
+
 class Portfolio(Base):
     __tablename__ = "portfolios"
     
@@ -264,13 +293,23 @@ class SocialPost(Base):
     content = Column(Text, nullable=False)
     post_type = Column(String(50), nullable=False, default="general")  # 'general', 'trade', 'analysis', 'news'
     symbol = Column(String(20), nullable=True)  # Associated stock symbol
-    tags = Column(Text, nullable=True)  # JSON string of tags
+    tags = Column(JSONType, nullable=True)  # List of tags
+    mentions = Column(JSONType, nullable=False, default=list)  # List of mentioned usernames
+    hashtags = Column(JSONType, nullable=False, default=list)  # List of hashtags
+    images = Column(JSONType, nullable=False, default=list)  # List of image URLs
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
     shares_count = Column(Integer, default=0)
+    views_count = Column(Integer, default=0)
     is_public = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Index for feed queries (followed authors, public, newest first); id breaks
+    # created_at ties so keyset and id-only offset pages never touch the heap
+    __table_args__ = (
+        Index('idx_social_posts_feed_id', 'user_id', 'is_public', created_at.desc(), id.desc()),
+    )
 
 class SocialLike(Base):
     __tablename__ = "social_likes"
@@ -279,6 +318,10 @@ class SocialLike(Base):
     user_id = Column(String(100), nullable=False)
     post_id = Column(Integer, ForeignKey("social_posts.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_social_likes_post_id', 'post_id'),
+    )
 
 class SocialComment(Base):
     __tablename__ = "social_comments"
@@ -288,6 +331,11 @@ class SocialComment(Base):
     post_id = Column(Integer, ForeignKey("social_posts.id"), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Index for loading the latest comments of a page of posts
+    __table_args__ = (
+        Index('idx_social_comments_post_created', 'post_id', created_at.desc()),
+    )
 
 class SocialFollow(Base):
     __tablename__ = "social_follows"
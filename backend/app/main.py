@@ -3,13 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 import uvicorn
 from dotenv import load_dotenv
+import logging
 
 from app.api import auth, portfolio, trading, market_data, analytics, ai, bank, ai_predictions, technical_analysis, news, websocket, market_screener, watchlist, charting, portfolio_comparison, options, backtesting, social_sentiment, enhanced_ai, realtime_alerts, advanced_orders, advanced_analytics, ml_training, social_features, interactive_charts, websocket_realtime, cache_management, options_trading, crypto_trading, ai_opponent, background_ai
-from app.db.database import engine, Base
+from app.db.database import engine, Base, SessionLocal
+from app.services.market_data_service import MarketDataService
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
@@ -67,6 +71,20 @@ app.include_router(cache_management.router, tags=["Cache Management"])
 app.include_router(ai_opponent.router, prefix="/api/ai-opponent", tags=["AI Opponent"])
 app.include_router(background_ai.router, prefix="/api/background-ai", tags=["Background AI"])
 
+@app.on_event("startup")
+def backfill_latest_prices():
+    """Populate the latest_prices rollup on deployments that predate it"""
+    db = SessionLocal()
+    try:
+        rows = MarketDataService(db).backfill_latest_prices()
+        if rows:
+            logger.info(f"Backfilled latest_prices for {rows} assets")
+    except Exception as e:
+        logger.error(f"Error backfilling latest_prices: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
 @app.get("/")
 async def root():
     return {
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import logging
 from typing import Dict, List, Optional, Any
@@ -8,6 +9,14 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# One keep-alive connection pool per process so consecutive Alpha Vantage calls
+# (and every service instance) reuse the TLS connection
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=20))
+
+# REALTIME_BULK_QUOTES accepts at most this many symbols per call
+BULK_QUOTES_BATCH_SIZE = 100
+
 class AlphaVantageService:
     """Enhanced Alpha Vantage API service with rate limiting and caching"""
     
@@ -49,7 +58,7 @@ class AlphaVantageService:
         params['apikey'] = self.api_key
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = _session.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -95,6 +104,39 @@ class AlphaVantageService:
             logger.error(f"Error getting current price for {symbol}: {e}")
             return None
     
+    def get_bulk_prices(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get current quotes for several symbols, one request per 100"""
+        quotes = {}
+        for i in range(0, len(symbols), BULK_QUOTES_BATCH_SIZE):
+            batch = symbols[i:i + BULK_QUOTES_BATCH_SIZE]
+            try:
+                data = self._make_request({
+                    'function': 'REALTIME_BULK_QUOTES',
+                    'symbol': ','.join(batch)
+                })
+                
+                for quote in data.get('data', []):
+                    if not quote.get('close'):
+                        continue
+                    price = float(quote['close'])
+                    quotes[quote['symbol']] = {
+                        'symbol': quote['symbol'],
+                        'price': price,
+                        'change': float(quote.get('change') or 0.0),
+                        'change_percent': float(str(quote.get('change_percent') or 0).replace('%', '')),
+                        'volume': int(float(quote.get('volume') or 0)),
+                        'high': float(quote.get('high') or price),
+                        'low': float(quote.get('low') or price),
+                        'open': float(quote.get('open') or price),
+                        'previous_close': float(quote.get('previous_close') or price),
+                        'timestamp': quote.get('timestamp') or datetime.now().isoformat()
+                    }
+                    
+            except Exception as e:
+                logger.error(f"Error getting bulk quotes for {batch}: {e}")
+        
+        return quotes
+    
     def get_daily_data(self, symbol: str, outputsize: str = 'compact') -> Optional[List[Dict[str, Any]]]:
         """Get daily OHLCV data"""
         try:
@@ -282,7 +324,7 @@ class AlphaVantageService:
                 'outputsize': 'compact' if days <= 30 else 'full'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = _session.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -151,23 +151,23 @@ class BacktestingService:
             trades = []
             current_position = 0
             
-            for i, row in df.iterrows():
-                if row['position'] != 0:
-                    if row['position'] > 0:  # Buy signal
+            for row in df.itertuples(index=False):
+                if row.position != 0:
+                    if row.position > 0:  # Buy signal
                         current_position = 1
                         trades.append({
-                            'date': row['date'].strftime('%Y-%m-%d'),
+                            'date': row.date.strftime('%Y-%m-%d'),
                             'action': 'BUY',
-                            'price': row['close'],
-                            'portfolio_value': row['portfolio_value']
+                            'price': row.close,
+                            'portfolio_value': row.portfolio_value
                         })
                     else:  # Sell signal
                         current_position = 0
                         trades.append({
-                            'date': row['date'].strftime('%Y-%m-%d'),
+                            'date': row.date.strftime('%Y-%m-%d'),
                             'action': 'SELL',
-                            'price': row['close'],
-                            'portfolio_value': row['portfolio_value']
+                            'price': row.close,
+                            'portfolio_value': row.portfolio_value
                         })
             
             return {
@@ -230,15 +230,15 @@ class BacktestingService:
             
             # Prepare results
             trades = []
-            for i, row in df.iterrows():
-                if row['position'] != 0:
-                    action = 'BUY' if row['position'] > 0 else 'SELL'
+            for row in df.itertuples(index=False):
+                if row.position != 0:
+                    action = 'BUY' if row.position > 0 else 'SELL'
                     trades.append({
-                        'date': row['date'].strftime('%Y-%m-%d'),
+                        'date': row.date.strftime('%Y-%m-%d'),
                         'action': action,
-                        'price': row['close'],
-                        'z_score': row['z_score'],
-                        'portfolio_value': row['portfolio_value']
+                        'price': row.close,
+                        'z_score': row.z_score,
+                        'portfolio_value': row.portfolio_value
                     })
             
             return {
@@ -297,15 +297,15 @@ class BacktestingService:
             
             # Prepare results
             trades = []
-            for i, row in df.iterrows():
-                if row['position'] != 0:
-                    action = 'BUY' if row['position'] > 0 else 'SELL'
+            for row in df.itertuples(index=False):
+                if row.position != 0:
+                    action = 'BUY' if row.position > 0 else 'SELL'
                     trades.append({
-                        'date': row['date'].strftime('%Y-%m-%d'),
+                        'date': row.date.strftime('%Y-%m-%d'),
                         'action': action,
-                        'price': row['close'],
-                        'momentum': row['momentum'],
-                        'portfolio_value': row['portfolio_value']
+                        'price': row.close,
+                        'momentum': row.momentum,
+                        'portfolio_value': row.portfolio_value
                     })
             
             return {
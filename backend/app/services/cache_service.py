@@ -332,6 +332,16 @@ class CacheManager:
         key = f"market_data:{symbol}"
         return self.cache.get(key)
     
+    def cache_market_data_many(self, data: Dict[str, Any], ttl: int = 60) -> bool:
+        """Cache market data for several symbols in one pipeline."""
+        mapping = {f"market_data:{symbol}": value for symbol, value in data.items()}
+        return self.cache.set_multiple(mapping, ttl)
+    
+    def get_cached_market_data_many(self, symbols: List[str]) -> Dict[str, Any]:
+        """Get cached market data for several symbols with one MGET."""
+        hits = self.cache.get_multiple([f"market_data:{symbol}" for symbol in symbols])
+        return {key.split(":", 1)[1]: value for key, value in hits.items()}
+    
     def cache_portfolio_data(self, user_id: str, data: Any, ttl: int = 300) -> bool:
         """Cache portfolio data for a user."""
         key = f"portfolio:{user_id}"
@@ -352,6 +362,26 @@ class CacheManager:
         key = f"technical:{symbol}"
         return self.cache.get(key)
     
+    def cache_chart_patterns(self, symbol: str, window: str, data: Any, ttl: int = 120) -> bool:
+        """Cache detected chart patterns for a symbol and date window."""
+        key = f"patterns:{symbol}:{window}"
+        return self.cache.set(key, data, ttl)
+    
+    def get_cached_chart_patterns(self, symbol: str, window: str) -> Optional[Any]:
+        """Get cached chart patterns for a symbol and date window."""
+        key = f"patterns:{symbol}:{window}"
+        return self.cache.get(key)
+    
+    def cache_chart_data(self, symbol: str, days: int, interval: str, data: Any, ttl: int = 120) -> bool:
+        """Cache a chart payload for a symbol, range and interval."""
+        key = f"chart:{symbol}:{days}:{interval}"
+        return self.cache.set(key, data, ttl)
+    
+    def get_cached_chart_data(self, symbol: str, days: int, interval: str) -> Optional[Any]:
+        """Get a cached chart payload for a symbol, range and interval."""
+        key = f"chart:{symbol}:{days}:{interval}"
+        return self.cache.get(key)
+    
     def cache_news_data(self, symbol: str, data: Any, ttl: int = 600) -> bool:
         """Cache news data for a symbol."""
         key = f"news:{symbol}"
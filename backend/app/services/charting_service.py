@@ -89,14 +89,14 @@ class ChartingService:
 
             # Convert to candlestick format
             candlesticks = []
-            for timestamp, row in resampled.iterrows():
+            for row in resampled.itertuples():
                 candlesticks.append({
-                    'timestamp': timestamp.isoformat(),
-                    'open': row['open'],
-                    'high': row['high'],
-                    'low': row['low'],
-                    'close': row['close'],
-                    'volume': row['volume']
+                    'timestamp': row.Index.isoformat(),
+                    'open': row.open,
+                    'high': row.high,
+                    'low': row.low,
+                    'close': row.close,
+                    'volume': row.volume
                 })
 
             # Calculate technical indicators for the chart
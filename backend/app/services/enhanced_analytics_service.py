@@ -7,6 +7,8 @@ from datetime import datetime, timedelta
 from scipy import stats
 from scipy.optimize import minimize
 import json
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 
 from app.db import models
@@ -14,6 +16,29 @@ from app.services.market_data_service import MarketDataService
 
 logger = logging.getLogger(__name__)
 
+# Per-thread scratch buffers reused by the drawdown kernels
+_tls = threading.local()
+
+# Bound on memoized (cumulative, running max) pairs per service instance
+_DD_CACHE_SIZE = 128
+
+# Probability of each scenario occurring
+_SCENARIO_PROBABILITIES = {
+    "bull_market": 0.3,
+    "bear_market": 0.2,
+    "high_volatility": 0.15,
+    "low_volatility": 0.25,
+    "crisis": 0.1
+}
+
+def _scratch(name: str, size: int) -> np.ndarray:
+    """Return a thread-local float64 buffer of at least ``size`` elements"""
+    buf = getattr(_tls, name, None)
+    if buf is None or buf.size < size:
+        buf = np.empty(size, dtype=np.float64)
+        setattr(_tls, name, buf)
+    return buf[:size]
+
 @dataclass
 class RiskMetrics:
     """Risk metrics data class"""
@@ -52,6 +77,8 @@ class EnhancedAnalyticsService:
         self.db = db
         self.market_data_service = MarketDataService(db)
         self.risk_free_rate = 0.02  # 2% risk-free rate
+        self._dd_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._rng = np.random.default_rng()
     
     def get_comprehensive_analytics(self, user_id: str, start_date: Optional[datetime] = None, 
                                   end_date: Optional[datetime] = None) -> Dict[str, Any]:
@@ -629,16 +656,17 @@ class EnhancedAnalyticsService:
             logger.error(f"Error calculating portfolio values: {e}")
             return []
     
-    def _calculate_asset_returns(self, holdings: List, start_date: datetime, end_date: datetime) -> Dict[str, List[float]]:
+    def _calculate_asset_returns(self, holdings: List, start_date: datetime, end_date: datetime) -> Dict[str, np.ndarray]:
         """Calculate individual asset returns"""
         try:
-            asset_returns = {}
-            for holding in holdings:
-                # This would typically fetch historical data
-                # For now, return mock data
-                days = (end_date - start_date).days
-                asset_returns[holding.symbol] = [np.random.normal(0.0005, 0.02) for _ in range(days)]
-            return asset_returns
+            # This would typically fetch historical data
+            # For now, return mock data drawn in a single block for all holdings
+            days = (end_date - start_date).days
+            block = np.empty((len(holdings), days), dtype=np.float32)
+            self._rng.standard_normal(dtype=np.float32, out=block)
+            np.multiply(block, np.float32(0.02), out=block)
+            np.add(block, np.float32(0.0005), out=block)
+            return {holding.symbol: block[i] for i, holding in enumerate(holdings)}
         except Exception as e:
             logger.error(f"Error calculating asset returns: {e}")
             return {}
@@ -646,10 +674,7 @@ class EnhancedAnalyticsService:
     def _calculate_max_drawdown(self, returns: pd.Series) -> float:
         """Calculate maximum drawdown"""
         try:
-            cumulative = (1 + returns).cumprod()
-            running_max = cumulative.expanding().max()
-            drawdown = (cumulative - running_max) / running_max
-            return drawdown.min()
+            return self._calculate_max_drawdown_arr(np.asarray(returns, dtype=np.float64))
         except Exception as e:
             logger.error(f"Error calculating max drawdown: {e}")
             return 0
@@ -657,24 +682,51 @@ class EnhancedAnalyticsService:
     def _calculate_drawdowns(self, returns: pd.Series) -> List[float]:
         """Calculate all drawdowns"""
         try:
-            cumulative = (1 + returns).cumprod()
-            running_max = cumulative.expanding().max()
-            drawdowns = (cumulative - running_max) / running_max
-            return [dd for dd in drawdowns if dd < 0]
+            return self._calculate_drawdowns_arr(np.asarray(returns, dtype=np.float64)).tolist()
         except Exception as e:
             logger.error(f"Error calculating drawdowns: {e}")
             return []
     
+    def _cum_and_peak(self, returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cumulative growth and its running max, memoized per input buffer"""
+        key = (returns.ctypes.data, returns.shape[0], returns.strides[0])
+        cached = self._dd_cache.get(key)
+        if cached is not None:
+            self._dd_cache.move_to_end(key)
+            return cached[1], cached[2]
+        cumulative = np.add(returns, 1.0)
+        np.cumprod(cumulative, out=cumulative)
+        running_max = np.maximum.accumulate(cumulative)
+        # Keep a reference to the input so its address cannot be reused while cached
+        self._dd_cache[key] = (returns, cumulative, running_max)
+        if len(self._dd_cache) > _DD_CACHE_SIZE:
+            self._dd_cache.popitem(last=False)
+        return cumulative, running_max
+    
+    def _calculate_max_drawdown_arr(self, returns: np.ndarray) -> float:
+        """Maximum drawdown of a raw returns array (single pass, no pandas)"""
+        n = returns.size
+        if n == 0:
+            return 0.0
+        cumulative, running_max = self._cum_and_peak(returns)
+        ratio = _scratch("dd_buf", n)
+        np.divide(cumulative, running_max, out=ratio)
+        return float(ratio.min() - 1.0)
+    
+    def _calculate_drawdowns_arr(self, returns: np.ndarray) -> np.ndarray:
+        """All negative drawdowns of a raw returns array"""
+        n = returns.size
+        if n == 0:
+            return returns
+        cumulative, running_max = self._cum_and_peak(returns)
+        drawdowns = _scratch("dd_buf", n)
+        np.divide(cumulative, running_max, out=drawdowns)
+        np.subtract(drawdowns, 1.0, out=drawdowns)
+        return drawdowns[drawdowns < 0]
+    
     def _get_scenario_probability(self, scenario_name: str) -> float:
         """Get probability of scenario occurrence"""
-        probabilities = {
-            "bull_market": 0.3,
-            "bear_market": 0.2,
-            "high_volatility": 0.15,
-            "low_volatility": 0.25,
-            "crisis": 0.1
-        }
-        return probabilities.get(scenario_name, 0.1)
+        return _SCENARIO_PROBABILITIES.get(scenario_name, 0.1)
     
     def _estimate_recovery_time(self, loss_magnitude: float) -> str:
         """Estimate recovery time based on loss magnitude"""
@@ -1,31 +1,127 @@
 import logging
 import json
 import re
+import hashlib
 from typing import Dict, List, Optional, Any, Tuple
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from datetime import datetime, timedelta
-from sqlalchemy import and_, or_, desc, func, text
-from collections import defaultdict
+from sqlalchemy import and_, or_, desc, func, text, case, update, select, insert, tuple_
+from collections import defaultdict, OrderedDict
 import asyncio
 from app.db import models
-from app.services.websocket_service import WebSocketManager
+from app.db.database import SessionLocal
+from app.services.websocket_service import get_websocket_manager
 
 logger = logging.getLogger(__name__)
 
+# Fan-out limits for WebSocket broadcasts
+BROADCAST_CONCURRENCY = 100
+BROADCAST_SEND_TIMEOUT = 5.0
+
+# User activity rows are buffered and written in batches off the request path
+ACTIVITY_QUEUE_SIZE = 10_000
+ACTIVITY_BATCH_SIZE = 500
+ACTIVITY_FLUSH_INTERVAL = 0.1
+
+# Moderation verdicts memoized per content hash (repeat posts and chat messages)
+MODERATION_CACHE_SIZE = 10_000
+
+_activity_queue: Optional[asyncio.Queue] = None
+_activity_drain_task: Optional[asyncio.Task] = None
+_activity_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _write_activity_batch(batch: List[Dict[str, Any]]):
+    """Insert a batch of user activity rows in one executemany"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.UserActivity), batch)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error writing user activity batch: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+async def _drain_activity_queue():
+    """Long-lived consumer that flushes queued activity every ~100ms or 500 rows"""
+    while True:
+        batch = [await _activity_queue.get()]
+        try:
+            await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+        except asyncio.CancelledError:
+            # Don't lose rows already taken off the queue
+            _write_activity_batch(batch)
+            raise
+        while len(batch) < ACTIVITY_BATCH_SIZE and not _activity_queue.empty():
+            batch.append(_activity_queue.get_nowait())
+        await asyncio.to_thread(_write_activity_batch, batch)
+
+def _get_activity_queue() -> asyncio.Queue:
+    """Get the activity queue, starting its consumer on the running loop if needed"""
+    global _activity_queue, _activity_drain_task, _activity_loop
+    loop = asyncio.get_running_loop()
+    if _activity_queue is None or _activity_loop is not loop:
+        # A queue is bound to the loop it was first used on
+        _activity_queue = asyncio.Queue(maxsize=ACTIVITY_QUEUE_SIZE)
+        _activity_drain_task = None
+        _activity_loop = loop
+    if _activity_drain_task is None or _activity_drain_task.done():
+        _activity_drain_task = asyncio.create_task(_drain_activity_queue())
+    return _activity_queue
+
+async def flush_activity_queue():
+    """Stop the consumer and write any activity still queued (used on shutdown)"""
+    global _activity_drain_task
+    if _activity_drain_task is not None:
+        _activity_drain_task.cancel()
+        try:
+            await _activity_drain_task
+        except asyncio.CancelledError:
+            pass
+        _activity_drain_task = None
+    if _activity_queue is None:
+        return
+    while not _activity_queue.empty():
+        batch = []
+        while len(batch) < ACTIVITY_BATCH_SIZE and not _activity_queue.empty():
+            batch.append(_activity_queue.get_nowait())
+        await asyncio.to_thread(_write_activity_batch, batch)
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a keyset cursor pointing just past the row (created_at, id)"""
+    return f"{created_at.isoformat()}|{row_id}"
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a keyset cursor into (created_at, id)"""
+    try:
+        created_at, row_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
 class EnhancedSocialService:
     """Enhanced social features service with real-time chat, following, and content moderation"""
     
     def __init__(self, db: Session):
         self.db = db
-        self.websocket_manager = WebSocketManager()
-        self.content_moderator = ContentModerator()
+        # Shared across requests: connections and moderation cache are process-wide
+        self.websocket_manager = get_websocket_manager(db)
+        self.content_moderator = get_content_moderator()
         self.chat_manager = ChatManager(db)
+        self._cache: Dict[Tuple, Any] = {}
         
+    def _memo(self, key: Tuple, fn):
+        """Return the cached result for key, computing it once per request"""
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+    
     # Enhanced Post Management
     def create_enhanced_post(self, user_id: str, content: str, post_type: str = "general", 
                            symbol: Optional[str] = None, tags: Optional[List[str]] = None,
                            images: Optional[List[str]] = None, mentions: Optional[List[str]] = None) -> Dict[str, Any]:
         """Create a new social post with enhanced features"""
+        self._cache = {}
         try:
             # Content moderation
             moderation_result = self.content_moderator.moderate_content(content)
@@ -46,10 +142,10 @@ class EnhancedSocialService:
                 content=content,
                 post_type=post_type,
                 symbol=symbol,
-                tags=json.dumps(tags or []),
-                mentions=json.dumps(extracted_mentions),
-                hashtags=json.dumps(extracted_hashtags),
-                images=json.dumps(images or []),
+                tags=tags or [],
+                mentions=extracted_mentions,
+                hashtags=extracted_hashtags,
+                images=images or [],
                 likes_count=0,
                 comments_count=0,
                 shares_count=0,
@@ -90,33 +186,41 @@ class EnhancedSocialService:
     
     def get_enhanced_feed(self, user_id: str, limit: int = 50, offset: int = 0, 
                          post_type: Optional[str] = None, symbol: Optional[str] = None,
-                         algorithm: str = "chronological") -> Dict[str, Any]:
+                         algorithm: str = "chronological", cursor: Optional[str] = None) -> Dict[str, Any]:
         """Get enhanced social feed with different algorithms"""
+        self._cache = {}
         try:
             # Get user preferences
             user_preferences = self._get_user_preferences(user_id)
             
             # Build base query
             if algorithm == "chronological":
-                posts = self._get_chronological_feed(user_id, limit, offset, post_type, symbol)
+                posts = self._get_chronological_feed(user_id, limit, offset, post_type, symbol, cursor)
             elif algorithm == "popular":
                 posts = self._get_popular_feed(user_id, limit, offset, post_type, symbol)
             elif algorithm == "personalized":
                 posts = self._get_personalized_feed(user_id, limit, offset, post_type, symbol, user_preferences)
             else:
-                posts = self._get_chronological_feed(user_id, limit, offset, post_type, symbol)
+                posts = self._get_chronological_feed(user_id, limit, offset, post_type, symbol, cursor)
+            
+            # Enhance posts with additional data, preloaded in bulk
+            users, liked_post_ids, comments_by_post = self._load_post_context(posts, user_id)
+            enhanced_posts = [
+                self._enhance_post_data(post, users, liked_post_ids, comments_by_post)
+                for post in posts
+            ]
             
-            # Enhance posts with additional data
-            enhanced_posts = []
-            for post in posts:
-                enhanced_post = self._enhance_post_data(post, user_id)
-                enhanced_posts.append(enhanced_post)
+            # Score-ordered feeds still page by offset
+            next_cursor = None
+            if posts and len(posts) == limit and algorithm not in ("popular", "personalized"):
+                next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
             
             return {
                 "posts": enhanced_posts,
                 "total_count": len(enhanced_posts),
                 "algorithm": algorithm,
-                "has_more": len(enhanced_posts) == limit
+                "has_more": len(enhanced_posts) == limit,
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
@@ -124,13 +228,11 @@ class EnhancedSocialService:
             return {"error": str(e)}
     
     def _get_chronological_feed(self, user_id: str, limit: int, offset: int, 
-                               post_type: Optional[str], symbol: Optional[str]) -> List[models.SocialPost]:
-        """Get chronological feed"""
-        following_ids = self._get_following_ids(user_id)
-        following_ids.append(user_id)
-        
+                               post_type: Optional[str], symbol: Optional[str],
+                               cursor: Optional[str] = None) -> List[models.SocialPost]:
+        """Get chronological feed, seeking past the cursor when one is given"""
         query = self.db.query(models.SocialPost).filter(
-            models.SocialPost.user_id.in_(following_ids),
+            self._feed_authors_clause(user_id),
             models.SocialPost.is_public == True
         )
         
@@ -139,16 +241,30 @@ class EnhancedSocialService:
         if symbol:
             query = query.filter(models.SocialPost.symbol == symbol)
         
-        return query.order_by(desc(models.SocialPost.created_at)).offset(offset).limit(limit).all()
+        order = (desc(models.SocialPost.created_at), desc(models.SocialPost.id))
+        query = query.order_by(*order)
+        
+        if cursor:
+            # Keyset pagination: jump straight to the next page via the feed index
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(models.SocialPost.created_at, models.SocialPost.id) < tuple_(cursor_created_at, cursor_id)
+            )
+        elif offset:
+            # Page over ids only (index-only on idx_social_posts_feed_id when no
+            # post_type/symbol filter applies), then fetch the rows actually returned
+            page_ids = query.with_entities(models.SocialPost.id).offset(offset).limit(limit)
+            return self.db.query(models.SocialPost).filter(
+                models.SocialPost.id.in_(page_ids.statement)
+            ).order_by(*order).all()
+        
+        return query.limit(limit).all()
     
     def _get_popular_feed(self, user_id: str, limit: int, offset: int, 
                          post_type: Optional[str], symbol: Optional[str]) -> List[models.SocialPost]:
         """Get popular feed based on engagement"""
-        following_ids = self._get_following_ids(user_id)
-        following_ids.append(user_id)
-        
         query = self.db.query(models.SocialPost).filter(
-            models.SocialPost.user_id.in_(following_ids),
+            self._feed_authors_clause(user_id),
             models.SocialPost.is_public == True,
             models.SocialPost.created_at >= datetime.now() - timedelta(days=7)  # Last 7 days
         )
@@ -172,15 +288,12 @@ class EnhancedSocialService:
                               post_type: Optional[str], symbol: Optional[str], 
                               preferences: Dict) -> List[models.SocialPost]:
         """Get personalized feed based on user preferences and behavior"""
-        following_ids = self._get_following_ids(user_id)
-        following_ids.append(user_id)
-        
         # Get user's interaction history
         user_interactions = self._get_user_interactions(user_id)
         
         # Build personalized query
         query = self.db.query(models.SocialPost).filter(
-            models.SocialPost.user_id.in_(following_ids),
+            self._feed_authors_clause(user_id),
             models.SocialPost.is_public == True
         )
         
@@ -198,14 +311,38 @@ class EnhancedSocialService:
                 )
             )
         
-        # Order by personalization score
-        posts = query.order_by(desc(models.SocialPost.created_at)).offset(offset).limit(limit * 2).all()
+        # Order by personalization score, computed in the database where supported
+        if self.db.get_bind().dialect.name == "postgresql":
+            score = self._personalization_score_expr(user_interactions, preferences)
+            return query.order_by(desc(score), desc(models.SocialPost.created_at)).offset(offset).limit(limit).all()
         
-        # Apply personalization scoring
+        # Fallback for backends without interval arithmetic (e.g. SQLite in tests)
+        posts = query.order_by(desc(models.SocialPost.created_at)).offset(offset).limit(limit * 2).all()
         personalized_posts = self._score_posts_for_user(posts, user_interactions, preferences)
         
         return personalized_posts[:limit]
     
+    def _personalization_score_expr(self, interactions: Dict, preferences: Dict):
+        """SQL expression mirroring _score_posts_for_user"""
+        post = models.SocialPost
+        
+        # Base score from engagement
+        score = post.likes_count * 0.1 + post.comments_count * 0.2 + post.shares_count * 0.3
+        
+        # Recency score, decaying over 1 week
+        hours_old = func.extract("epoch", func.now() - post.created_at) / 3600
+        score = score + func.greatest(0, 1 - hours_old / 168) * 0.5
+        
+        # Symbol, author and post type preference scores
+        if preferences.get("preferred_symbols"):
+            score = score + case((post.symbol.in_(preferences["preferred_symbols"]), 1.0), else_=0.0)
+        if interactions.get("frequently_interacted_authors"):
+            score = score + case((post.user_id.in_(interactions["frequently_interacted_authors"]), 0.8), else_=0.0)
+        if preferences.get("preferred_post_types"):
+            score = score + case((post.post_type.in_(preferences["preferred_post_types"]), 0.3), else_=0.0)
+        
+        return score
+    
     def _score_posts_for_user(self, posts: List[models.SocialPost], 
                              interactions: Dict, preferences: Dict) -> List[models.SocialPost]:
         """Score posts for personalization"""
@@ -258,8 +395,7 @@ class EnhancedSocialService:
             )
             
             self.db.add(chat_room)
-            self.db.commit()
-            self.db.refresh(chat_room)
+            self.db.flush()
             
             # Add creator as admin
             membership = models.ChatMembership(
@@ -280,21 +416,24 @@ class EnhancedSocialService:
             
         except Exception as e:
             logger.error(f"Error creating chat room: {e}")
+            self.db.rollback()
             return {"error": str(e)}
     
     def send_chat_message(self, user_id: str, room_id: int, content: str, 
                          message_type: str = "text") -> Dict[str, Any]:
         """Send a message in a chat room"""
         try:
-            # Check if user is member of the room
-            membership = self.db.query(models.ChatMembership).filter(
-                and_(
-                    models.ChatMembership.room_id == room_id,
-                    models.ChatMembership.user_id == user_id
-                )
-            ).first()
+            # Check if user is member of the room (SELECT EXISTS, no row load)
+            is_member = self.db.query(
+                self.db.query(models.ChatMembership).filter(
+                    and_(
+                        models.ChatMembership.room_id == room_id,
+                        models.ChatMembership.user_id == user_id
+                    )
+                ).exists()
+            ).scalar()
             
-            if not membership:
+            if not is_member:
                 return {"error": "User is not a member of this chat room"}
             
             # Content moderation
@@ -336,12 +475,12 @@ class EnhancedSocialService:
         """Broadcast chat message to all room members"""
         try:
             # Get room members
-            members = self.db.query(models.ChatMembership).filter(
-                models.ChatMembership.room_id == room_id
-            ).all()
+            member_ids = self.db.execute(
+                select(models.ChatMembership.user_id).where(models.ChatMembership.room_id == room_id)
+            ).scalars().all()
             
             # Get user info
-            user = self.db.query(models.User).filter(models.User.id == message.user_id).first()
+            user = self._get_user(message.user_id)
             
             message_data = {
                 "type": "chat_message",
@@ -355,8 +494,7 @@ class EnhancedSocialService:
             }
             
             # Send to all members
-            for member in members:
-                await self.websocket_manager.send_to_user(member.user_id, message_data)
+            await self._send_to_users(member_ids, message_data)
                 
         except Exception as e:
             logger.error(f"Error broadcasting chat message: {e}")
@@ -369,14 +507,16 @@ class EnhancedSocialService:
                 return {"error": "Cannot follow yourself"}
             
             # Check if already following
-            existing_follow = self.db.query(models.SocialFollow).filter(
-                and_(
-                    models.SocialFollow.follower_id == follower_id,
-                    models.SocialFollow.following_id == following_id
-                )
-            ).first()
+            already_following = self.db.query(
+                self.db.query(models.SocialFollow).filter(
+                    and_(
+                        models.SocialFollow.follower_id == follower_id,
+                        models.SocialFollow.following_id == following_id
+                    )
+                ).exists()
+            ).scalar()
             
-            if existing_follow:
+            if already_following:
                 return {"error": "Already following this user"}
             
             # Create follow relationship
@@ -407,6 +547,7 @@ class EnhancedSocialService:
             
         except Exception as e:
             logger.error(f"Error following user: {e}")
+            self.db.rollback()
             return {"error": str(e)}
     
     def unfollow_user(self, follower_id: str, following_id: str) -> Dict[str, Any]:
@@ -438,46 +579,45 @@ class EnhancedSocialService:
             
         except Exception as e:
             logger.error(f"Error unfollowing user: {e}")
+            self.db.rollback()
             return {"error": str(e)}
     
     def get_user_suggestions(self, user_id: str, limit: int = 10) -> Dict[str, Any]:
         """Get user suggestions based on mutual connections and interests"""
         try:
-            # Get user's current following
-            following = self.db.query(models.SocialFollow).filter(
+            # Users the current user already follows
+            followees = select(models.SocialFollow.following_id).where(
                 models.SocialFollow.follower_id == user_id
-            ).all()
-            following_ids = [f.following_id for f in following]
-            following_ids.append(user_id)
+            )
             
-            # Get mutual connections
-            mutual_connections = self.db.query(
-                models.SocialFollow.following_id,
-                func.count(models.SocialFollow.follower_id).label('mutual_count')
-            ).filter(
-                and_(
-                    models.SocialFollow.following_id.notin_(following_ids),
-                    models.SocialFollow.follower_id.in_(
-                        self.db.query(models.SocialFollow.following_id).filter(
-                            models.SocialFollow.follower_id == user_id
-                        )
-                    )
+            # Friends of friends: f1 is "I follow X", f2 is "X follows candidate"
+            f1 = aliased(models.SocialFollow)
+            f2 = aliased(models.SocialFollow)
+            mutual_count = func.count().label('mutual_count')
+            rows = self.db.execute(
+                select(models.User.id, models.User.username, mutual_count)
+                .select_from(f1)
+                .join(f2, f1.following_id == f2.follower_id)
+                .join(models.User, models.User.id == f2.following_id)
+                .where(
+                    f1.follower_id == user_id,
+                    f2.following_id != user_id,
+                    f2.following_id.notin_(followees)
                 )
-            ).group_by(models.SocialFollow.following_id).order_by(desc('mutual_count')).limit(limit).all()
+                .group_by(models.User.id, models.User.username)
+                .order_by(desc(mutual_count))
+                .limit(limit)
+            ).all()
             
-            suggestions = []
-            for suggestion in mutual_connections:
-                user = self.db.query(models.User).filter(
-                    models.User.id == suggestion.following_id
-                ).first()
-                
-                if user:
-                    suggestions.append({
-                        "user_id": user.id,
-                        "username": user.username,
-                        "mutual_connections": suggestion.mutual_count,
-                        "reason": f"{suggestion.mutual_count} mutual connections"
-                    })
+            suggestions = [
+                {
+                    "user_id": row.id,
+                    "username": row.username,
+                    "mutual_connections": row.mutual_count,
+                    "reason": f"{row.mutual_count} mutual connections"
+                }
+                for row in rows
+            ]
             
             return {
                 "suggestions": suggestions,
@@ -533,57 +673,110 @@ class EnhancedSocialService:
     
     def _get_following_ids(self, user_id: str) -> List[str]:
         """Get list of user IDs that the user is following"""
-        following = self.db.query(models.SocialFollow).filter(
+        def load():
+            return tuple(self.db.execute(
+                select(models.SocialFollow.following_id).where(models.SocialFollow.follower_id == user_id)
+            ).scalars())
+        return list(self._memo(("following", user_id), load))
+    
+    def _get_user(self, user_id: str) -> Optional[Any]:
+        """Get a user by id, memoized for the current request"""
+        return self._memo(
+            ("user", user_id),
+            lambda: self.db.query(models.User).filter(models.User.id == user_id).first()
+        )
+    
+    def _feed_authors_clause(self, user_id: str):
+        """Filter posts to the user's own and those of users they follow, resolved in SQL"""
+        followed = self.db.query(models.SocialFollow.following_id).filter(
             models.SocialFollow.follower_id == user_id
-        ).all()
-        return [f.following_id for f in following]
+        )
+        return or_(
+            models.SocialPost.user_id == user_id,
+            models.SocialPost.user_id.in_(followed.scalar_subquery())
+        )
     
     def _get_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """Get user preferences for personalization"""
         # This would typically come from a user preferences table
         # For now, return default preferences
-        return {
+        return self._memo(("preferences", user_id), lambda: {
             "preferred_symbols": [],
             "preferred_post_types": ["general", "analysis"],
             "preferred_authors": []
-        }
+        })
     
     def _get_user_interactions(self, user_id: str) -> Dict[str, Any]:
         """Get user interaction history for personalization"""
         # This would analyze user's likes, comments, shares, etc.
-        return {
+        return self._memo(("interactions", user_id), lambda: {
             "frequently_interacted_authors": [],
             "preferred_content_types": [],
             "engagement_patterns": {}
-        }
+        })
     
-    def _enhance_post_data(self, post: models.SocialPost, user_id: str) -> Dict[str, Any]:
-        """Enhance post data with additional information"""
-        # Get user info
-        user = self.db.query(models.User).filter(models.User.id == post.user_id).first()
+    def _load_post_context(self, posts: List[models.SocialPost], user_id: str) -> Tuple[Dict[str, Any], set, Dict[int, List[Any]]]:
+        """Bulk-load authors, the viewer's likes and recent comments for a page of posts"""
+        if not posts:
+            return {}, set(), {}
+        
+        post_ids = [post.id for post in posts]
+        author_ids = {post.user_id for post in posts}
         
-        # Check if current user liked the post
-        user_liked = self.db.query(models.SocialLike).filter(
-            and_(
-                models.SocialLike.post_id == post.id,
-                models.SocialLike.user_id == user_id
+        # Authors, skipping any already loaded during this request
+        missing_ids = [uid for uid in author_ids if ("user", uid) not in self._cache]
+        if missing_ids:
+            loaded = {
+                user.id: user
+                for user in self.db.query(models.User).filter(models.User.id.in_(missing_ids))
+            }
+            for uid in missing_ids:
+                self._cache[("user", uid)] = loaded.get(uid)
+        users = {uid: self._cache[("user", uid)] for uid in author_ids}
+        
+        # Posts the current user liked
+        liked_post_ids = {
+            row.post_id
+            for row in self.db.query(models.SocialLike.post_id).filter(
+                models.SocialLike.user_id == user_id,
+                models.SocialLike.post_id.in_(post_ids)
             )
-        ).first() is not None
+        }
+        
+        # Three most recent comments per post
+        ranked = self.db.query(
+            models.SocialComment.id.label("comment_id"),
+            func.row_number().over(
+                partition_by=models.SocialComment.post_id,
+                order_by=desc(models.SocialComment.created_at)
+            ).label("rn")
+        ).filter(models.SocialComment.post_id.in_(post_ids)).subquery()
         
-        # Get recent comments
-        comments = self.db.query(models.SocialComment).filter(
-            models.SocialComment.post_id == post.id
-        ).order_by(desc(models.SocialComment.created_at)).limit(3).all()
+        comments_by_post: Dict[int, List[Any]] = defaultdict(list)
+        recent_comments = self.db.query(models.SocialComment).join(
+            ranked, ranked.c.comment_id == models.SocialComment.id
+        ).filter(ranked.c.rn <= 3).order_by(desc(models.SocialComment.created_at))
+        for comment in recent_comments:
+            comments_by_post[comment.post_id].append(comment)
+        
+        return users, liked_post_ids, comments_by_post
+    
+    def _enhance_post_data(self, post: models.SocialPost, users: Dict[str, Any], 
+                          liked_post_ids: set, comments_by_post: Dict[int, List[Any]]) -> Dict[str, Any]:
+        """Enhance post data with preloaded author, like and comment information"""
+        user = users.get(post.user_id)
+        user_liked = post.id in liked_post_ids
+        comments = comments_by_post.get(post.id, [])
         
         return {
             "id": post.id,
             "content": post.content,
             "post_type": post.post_type,
             "symbol": post.symbol,
-            "tags": json.loads(post.tags) if post.tags else [],
-            "mentions": json.loads(post.mentions) if post.mentions else [],
-            "hashtags": json.loads(post.hashtags) if post.hashtags else [],
-            "images": json.loads(post.images) if post.images else [],
+            "tags": post.tags or [],
+            "mentions": post.mentions or [],
+            "hashtags": post.hashtags or [],
+            "images": post.images or [],
             "likes_count": post.likes_count,
             "comments_count": post.comments_count,
             "shares_count": post.shares_count,
@@ -607,62 +800,69 @@ class EnhancedSocialService:
         }
     
     def _update_user_activity(self, user_id: str, activity_type: str):
-        """Update user activity tracking"""
+        """Update user activity tracking (queued, written in the background)"""
+        activity = {
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "timestamp": datetime.now()
+        }
         try:
-            activity = models.UserActivity(
-                user_id=user_id,
-                activity_type=activity_type,
-                timestamp=datetime.now()
-            )
-            self.db.add(activity)
-            self.db.commit()
-        except Exception as e:
-            logger.error(f"Error updating user activity: {e}")
+            _get_activity_queue().put_nowait(activity)
+        except asyncio.QueueFull:
+            logger.warning(f"User activity queue full, dropping {activity_type} for {user_id}")
+        except RuntimeError:
+            # No running event loop (e.g. scripts), so write inline
+            _write_activity_batch([activity])
     
     def _update_follower_counts(self, user_id: str, change: int):
-        """Update follower count for a user"""
-        try:
-            user = self.db.query(models.User).filter(models.User.id == user_id).first()
-            if user:
-                current_count = getattr(user, 'followers_count', 0)
-                user.followers_count = max(0, current_count + change)
-                self.db.commit()
-        except Exception as e:
-            logger.error(f"Error updating follower count: {e}")
+        """Update follower count for a user (best-effort, committed by the caller)"""
+        self._update_user_count(user_id, "followers_count", change)
     
     def _update_following_counts(self, user_id: str, change: int):
-        """Update following count for a user"""
+        """Update following count for a user (best-effort, committed by the caller)"""
+        self._update_user_count(user_id, "following_count", change)
+    
+    def _update_user_count(self, user_id: str, column: str, change: int):
+        """Atomically adjust a user counter inside a savepoint so a failure
+        never rolls back the follow row it accompanies"""
+        # begin_nested flushes pending rows first; let those errors reach the caller
+        savepoint = self.db.begin_nested()
         try:
-            user = self.db.query(models.User).filter(models.User.id == user_id).first()
-            if user:
-                current_count = getattr(user, 'following_count', 0)
-                user.following_count = max(0, current_count + change)
-                self.db.commit()
+            counter = getattr(models.User, column)
+            new_count = counter + change
+            self.db.execute(
+                update(models.User)
+                .where(models.User.id == user_id)
+                .values({column: case((new_count < 0, 0), else_=new_count)})
+            )
+            savepoint.commit()
         except Exception as e:
-            logger.error(f"Error updating following count: {e}")
+            savepoint.rollback()
+            logger.error(f"Error updating {column} for {user_id}: {e}")
     
     async def _notify_mentioned_users(self, post_id: int, mentions: List[str]):
         """Notify users who were mentioned in a post"""
         try:
-            for mention in mentions:
-                user = self.db.query(models.User).filter(
-                    models.User.username == mention
-                ).first()
-                
-                if user:
-                    notification = {
-                        "type": "mention",
-                        "post_id": post_id,
-                        "message": f"You were mentioned in a post"
-                    }
-                    await self.websocket_manager.send_to_user(user.id, notification)
+            if not mentions:
+                return
+            
+            users = self.db.query(models.User.id).filter(
+                models.User.username.in_(mentions)
+            ).all()
+            
+            notification = {
+                "type": "mention",
+                "post_id": post_id,
+                "message": "You were mentioned in a post"
+            }
+            await self._send_to_users([user.id for user in users], notification)
         except Exception as e:
             logger.error(f"Error notifying mentioned users: {e}")
     
     async def _notify_follow(self, follower_id: str, following_id: str):
         """Notify user when they are followed"""
         try:
-            follower = self.db.query(models.User).filter(models.User.id == follower_id).first()
+            follower = self._get_user(follower_id)
             
             notification = {
                 "type": "follow",
@@ -671,24 +871,44 @@ class EnhancedSocialService:
                 "message": f"{follower.username if follower else 'Someone'} started following you"
             }
             
-            await self.websocket_manager.send_to_user(following_id, notification)
+            await self.websocket_manager.send_personal_message(notification, following_id)
         except Exception as e:
             logger.error(f"Error notifying follow: {e}")
     
     async def _broadcast_to_followers(self, user_id: str, event_type: str, data: Dict):
         """Broadcast event to user's followers"""
         try:
-            followers = self.db.query(models.SocialFollow).filter(
-                models.SocialFollow.following_id == user_id
-            ).all()
-            
-            for follower in followers:
-                await self.websocket_manager.send_to_user(follower.follower_id, {
-                    "type": event_type,
-                    "data": data
-                })
+            follower_ids = self.db.execute(
+                select(models.SocialFollow.follower_id).where(models.SocialFollow.following_id == user_id)
+            ).scalars().all()
+            
+            await self._send_to_users(follower_ids, {
+                "type": event_type,
+                "data": data
+            })
         except Exception as e:
             logger.error(f"Error broadcasting to followers: {e}")
+    
+    async def _send_to_users(self, user_ids: List[str], message: Dict[str, Any]) -> Dict[str, bool]:
+        """Send one message to many users concurrently, with bounded fan-out and per-send timeouts"""
+        # Serialize once; every recipient shares the same payload string
+        payload = json.dumps(message, default=str)
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        
+        async def safe_send(user_id: str) -> Tuple[str, bool]:
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(
+                        self.websocket_manager.send_text_to_user(user_id, payload),
+                        BROADCAST_SEND_TIMEOUT
+                    )
+                    return user_id, True
+                except Exception as e:
+                    logger.warning(f"Failed to deliver message to user {user_id}: {e}")
+                    return user_id, False
+        
+        results = await asyncio.gather(*[safe_send(user_id) for user_id in user_ids])
+        return dict(results)
 
 
 class ContentModerator:
@@ -701,34 +921,37 @@ class ContentModerator:
         self.spam_patterns = [
             r"buy\s+now", r"sell\s+now", r"guaranteed\s+profit", r"get\s+rich\s+quick"
         ]
+        # Single-pass, case-insensitive matchers for both lists
+        self._bad_re = re.compile("|".join(map(re.escape, self.inappropriate_words)), re.IGNORECASE)
+        self._spam_re = re.compile("|".join(self.spam_patterns), re.IGNORECASE)
+        self._repeat_re = re.compile(r'(.)\1{4,}')
+        self._verdicts: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
     
     def moderate_content(self, content: str) -> Dict[str, Any]:
-        """Moderate content for inappropriate material"""
+        """Moderate content for inappropriate material, reusing verdicts for repeated content"""
+        if not isinstance(content, str):
+            return self._moderate_uncached(content)
+        
+        key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+        verdict = self._verdicts.get(key)
+        if verdict is not None:
+            self._verdicts.move_to_end(key)
+        else:
+            verdict = self._moderate_uncached(content)
+            if verdict["reason"] != "Moderation error":
+                self._verdicts[key] = verdict
+                if len(self._verdicts) > MODERATION_CACHE_SIZE:
+                    self._verdicts.popitem(last=False)
+        
+        # Hand out copies so callers can't mutate the cached verdict
+        return {**verdict, "suggestions": list(verdict["suggestions"])}
+    
+    def _moderate_uncached(self, content: str) -> Dict[str, Any]:
+        """Run the moderation checks on content"""
         try:
-            content_lower = content.lower()
-            
-            # Check for inappropriate words
-            for word in self.inappropriate_words:
-                if word in content_lower:
-                    return {
-                        "approved": False,
-                        "reason": f"Content contains inappropriate word: {word}",
-                        "score": 0.0,
-                        "suggestions": ["Please remove inappropriate language"]
-                    }
-            
-            # Check for spam patterns
-            for pattern in self.spam_patterns:
-                if re.search(pattern, content_lower):
-                    return {
-                        "approved": False,
-                        "reason": "Content appears to be spam",
-                        "score": 0.2,
-                        "suggestions": ["Avoid promotional language and guarantees"]
-                    }
-            
-            # Check content length
-            if len(content) < 10:
+            # Check content length first, it is the cheapest rejection
+            n = len(content)
+            if n < 10:
                 return {
                     "approved": False,
                     "reason": "Content too short",
@@ -736,7 +959,7 @@ class ContentModerator:
                     "suggestions": ["Please provide more meaningful content"]
                 }
             
-            if len(content) > 1000:
+            if n > 1000:
                 return {
                     "approved": False,
                     "reason": "Content too long",
@@ -744,6 +967,25 @@ class ContentModerator:
                     "suggestions": ["Please keep content under 1000 characters"]
                 }
             
+            # Check for inappropriate words
+            match = self._bad_re.search(content)
+            if match:
+                return {
+                    "approved": False,
+                    "reason": f"Content contains inappropriate word: {match.group(0).lower()}",
+                    "score": 0.0,
+                    "suggestions": ["Please remove inappropriate language"]
+                }
+            
+            # Check for spam patterns
+            if self._spam_re.search(content):
+                return {
+                    "approved": False,
+                    "reason": "Content appears to be spam",
+                    "score": 0.2,
+                    "suggestions": ["Avoid promotional language and guarantees"]
+                }
+            
             # Calculate moderation score
             score = self._calculate_moderation_score(content)
             
@@ -767,8 +1009,8 @@ class ContentModerator:
         """Calculate moderation score (0.0 to 1.0)"""
         score = 1.0
         
-        # Penalize for excessive capitalization
-        if len([c for c in content if c.isupper()]) > len(content) * 0.3:
+        # Penalize for excessive capitalization (only possible if there is any uppercase)
+        if not content.islower() and sum(map(str.isupper, content)) > len(content) * 0.3:
             score -= 0.2
         
         # Penalize for excessive punctuation
@@ -776,12 +1018,23 @@ class ContentModerator:
             score -= 0.1
         
         # Penalize for repeated characters
-        if re.search(r'(.)\1{4,}', content):
+        if self._repeat_re.search(content):
             score -= 0.3
         
         return max(0.0, min(1.0, score))
 
 
+# Global content moderator instance
+content_moderator: Optional[ContentModerator] = None
+
+def get_content_moderator() -> ContentModerator:
+    """Get or create the content moderator instance."""
+    global content_moderator
+    if content_moderator is None:
+        content_moderator = ContentModerator()
+    return content_moderator
+
+
 class ChatManager:
     """Chat room management"""
     
@@ -791,54 +1044,71 @@ class ChatManager:
     def get_user_chat_rooms(self, user_id: str) -> List[Dict[str, Any]]:
         """Get chat rooms for a user"""
         try:
-            memberships = self.db.query(models.ChatMembership).filter(
+            # Only the columns we return, in one round-trip and without ORM objects
+            rows = self.db.query(
+                models.ChatRoom.id,
+                models.ChatRoom.name,
+                models.ChatRoom.description,
+                models.ChatRoom.member_count,
+                models.ChatRoom.is_public,
+                models.ChatMembership.role,
+                models.ChatMembership.joined_at
+            ).join(
+                models.ChatMembership, models.ChatMembership.room_id == models.ChatRoom.id
+            ).filter(
                 models.ChatMembership.user_id == user_id
             ).all()
             
-            rooms = []
-            for membership in memberships:
-                room = self.db.query(models.ChatRoom).filter(
-                    models.ChatRoom.id == membership.room_id
-                ).first()
-                
-                if room:
-                    rooms.append({
-                        "room_id": room.id,
-                        "name": room.name,
-                        "description": room.description,
-                        "role": membership.role,
-                        "member_count": room.member_count,
-                        "is_public": room.is_public,
-                        "joined_at": membership.joined_at.isoformat()
-                    })
-            
-            return rooms
+            return [
+                {
+                    "room_id": room_id,
+                    "name": name,
+                    "description": description,
+                    "role": role,
+                    "member_count": member_count,
+                    "is_public": is_public,
+                    "joined_at": joined_at.isoformat()
+                }
+                for room_id, name, description, member_count, is_public, role, joined_at in rows
+            ]
             
         except Exception as e:
             logger.error(f"Error getting user chat rooms: {e}")
             return []
     
-    def get_room_messages(self, room_id: int, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get messages for a chat room"""
+    def get_room_messages(self, room_id: int, limit: int = 50, offset: int = 0,
+                          before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get messages for a chat room, newest first, seeking past `before` when given"""
         try:
-            messages = self.db.query(models.ChatMessage).filter(
+            # Author usernames come back in the same SELECT
+            query = self.db.query(models.ChatMessage, models.User.username).outerjoin(
+                models.User, models.User.id == models.ChatMessage.user_id
+            ).filter(
                 models.ChatMessage.room_id == room_id
-            ).order_by(desc(models.ChatMessage.created_at)).offset(offset).limit(limit).all()
+            ).order_by(desc(models.ChatMessage.created_at), desc(models.ChatMessage.id))
             
-            formatted_messages = []
-            for message in messages:
-                user = self.db.query(models.User).filter(models.User.id == message.user_id).first()
-                
-                formatted_messages.append({
+            if before:
+                # Keyset pagination over (room_id, created_at, id)
+                before_created_at, before_id = decode_cursor(before)
+                query = query.filter(
+                    tuple_(models.ChatMessage.created_at, models.ChatMessage.id) < tuple_(before_created_at, before_id)
+                )
+            elif offset:
+                query = query.offset(offset)
+            
+            rows = query.limit(limit).all()
+            
+            return [
+                {
                     "id": message.id,
                     "content": message.content,
                     "message_type": message.message_type,
                     "user_id": message.user_id,
-                    "username": user.username if user else "Unknown",
+                    "username": username or "Unknown",
                     "created_at": message.created_at.isoformat()
-                })
-            
-            return formatted_messages
+                }
+                for message, username in rows
+            ]
             
         except Exception as e:
             logger.error(f"Error getting room messages: {e}")
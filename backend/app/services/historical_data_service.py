@@ -5,13 +5,129 @@ Integrates multiple APIs for stocks and crypto historical data
 
 import httpx
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
+import hashlib
+import time
+import msgspec
+import orjson
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple, NamedTuple
 from datetime import datetime, timedelta
 import logging
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+import redis.asyncio as aioredis
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Cache TTL (seconds) for live historical data, by bar interval
+CACHE_TTL_BY_INTERVAL = {
+    "1m": 60,
+    "1h": 300,
+    "1d": 86400
+}
+DEFAULT_CACHE_TTL = 300
+
+# In-process L1 cache in front of Redis; kept small and short-lived to bound
+# staleness across workers
+L1_CACHE_SIZE = 1024
+L1_CACHE_TTL = 60
+
+# OHLCV payloads are column arrays: {"timestamps": [...], "open": [...], ...}
+OHLCV_LAYOUT = "columnar"
+
+# Seconds to wait on a provider before also starting the next one
+PROVIDER_HEDGE_DELAY = 2.0
+
+# Max symbols fetched at once by the batch entry points
+BATCH_CONCURRENCY = 10
+
+# Provider symbol mappings
+COINAPI_SYMBOL_MAP = {
+    'BTC': 'BTC/USD',
+    'ETH': 'ETH/USD',
+    'SOL': 'SOL/USD',
+    'ADA': 'ADA/USD',
+    'MATIC': 'MATIC/USD',
+    'AVAX': 'AVAX/USD',
+    'DOGE': 'DOGE/USD',
+    'SHIB': 'SHIB/USD',
+    'LINK': 'LINK/USD',
+    'UNI': 'UNI/USD',
+    'LTC': 'LTC/USD'
+}
+
+COINGECKO_ID_MAP = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum',
+    'SOL': 'solana',
+    'ADA': 'cardano',
+    'MATIC': 'matic-network',
+    'AVAX': 'avalanche-2',
+    'DOGE': 'dogecoin',
+    'SHIB': 'shiba-inu',
+    'LINK': 'chainlink',
+    'UNI': 'uniswap',
+    'LTC': 'litecoin'
+}
+
+# Typed bar schemas, decoded straight from the response bytes with no intermediate dicts
+class CoinAPIBar(msgspec.Struct):
+    time_period_start: str = ""
+    price_open: Optional[float] = None
+    price_high: Optional[float] = None
+    price_low: Optional[float] = None
+    price_close: Optional[float] = None
+    volume_traded: Optional[float] = None
+
+class CryptoCompareBar(msgspec.Struct):
+    time: int = 0
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+    volumeto: Optional[float] = None
+
+class CryptoCompareResponse(msgspec.Struct):
+    Response: str = ""
+    Data: List[CryptoCompareBar] = []
+
+_coinapi_decoder = msgspec.json.Decoder(List[CoinAPIBar])
+_cryptocompare_decoder = msgspec.json.Decoder(CryptoCompareResponse)
+
+class TimeRange(NamedTuple):
+    start_ts: int
+    end_ts: int
+    start_date: str
+    end_date: str
+    start_iso: str
+    end_iso: str
+
+def _iso_timestamps(values: List[Any], unit: str) -> List[str]:
+    """Format epoch timestamps (UTC) as ISO-8601 strings in one vectorised call"""
+    if not values:
+        return []
+    return pd.to_datetime(values, unit=unit).strftime("%Y-%m-%dT%H:%M:%S").tolist()
+
+@lru_cache(maxsize=64)
+def _time_range(days: int, minute: int) -> TimeRange:
+    """Request time range ending at the given minute, in every format the providers use"""
+    end = datetime.fromtimestamp(minute * 60)
+    start = end - timedelta(days=days)
+    return TimeRange(
+        int(start.timestamp()),
+        int(end.timestamp()),
+        start.strftime("%Y-%m-%d"),
+        end.strftime("%Y-%m-%d"),
+        start.strftime("%Y-%m-%dT%H:%M:%S"),
+        end.strftime("%Y-%m-%dT%H:%M:%S")
+    )
+
+def _current_time_range(days: int) -> TimeRange:
+    """Time range for the last `days` days, recomputed at most once a minute per `days`"""
+    return _time_range(days, int(time.time() // 60))
+
 class HistoricalDataService:
     def __init__(self):
         # API Keys
@@ -28,6 +144,80 @@ class HistoricalDataService:
         self.coinapi_base_url = settings.coinapi_base_url
         self.coingecko_base_url = settings.coingecko_base_url
         self.cryptocompare_base_url = settings.cryptocompare_base_url
+        
+        # Live providers in order of preference; ones without an API key are
+        # left out, and Nasdaq Data Link is skipped until it is implemented
+        stock_providers = [
+            ('finnhub', self._get_finnhub_stock_data, bool(self.finnhub_api_key)),
+            ('quandl', self._get_quandl_stock_data, bool(self.quandl_api_key)),
+        ]
+        crypto_providers = [
+            ('coinapi', self._get_coinapi_crypto_data, bool(self.coinapi_api_key)),
+            ('coingecko', self._get_coingecko_crypto_data, True),
+            ('cryptocompare', self._get_cryptocompare_crypto_data, True),
+        ]
+        self._stock_providers = [(name, func) for name, func, enabled in stock_providers if enabled]
+        self._crypto_providers = [(name, func) for name, func, enabled in crypto_providers if enabled]
+        
+        # Providers that answered 429, mapped to when they may be tried again
+        self._cool_down: Dict[str, float] = {}
+        
+        # Random source for mock fallback data
+        self._rng = np.random.default_rng()
+        
+        # One pooled client for all providers, so connections are reused across calls
+        self._client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20),
+            timeout=15.0
+        )
+        
+        # Per-process L1 cache, checked before Redis
+        self._l1: TTLCache = TTLCache(maxsize=L1_CACHE_SIZE, ttl=L1_CACHE_TTL)
+        
+        # Response cache shared across workers; connects lazily on first use
+        self._redis = aioredis.from_url(
+            settings.redis_url,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+
+    async def close(self):
+        """Close the shared HTTP client and Redis connections"""
+        await self._client.aclose()
+        await self._redis.close()
+
+    def _cache_key(self, kind: str, symbol: str, days: int, interval: str) -> str:
+        """Build the Redis key for a historical data request"""
+        params = hashlib.md5(f"{symbol}:{days}:{interval}".encode()).hexdigest()
+        return f"hist:{OHLCV_LAYOUT}:{kind}:{params}"
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response from L1 or Redis, or None on miss or if Redis is unavailable"""
+        cached = self._l1.get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            cached = await self._redis.get(key)
+        except Exception as e:
+            logger.warning(f"Historical data cache read failed: {e}")
+            return None
+        
+        if not cached:
+            return None
+        result = orjson.loads(cached)
+        self._l1[key] = result
+        return result
+
+    async def _cache_set(self, key: str, interval: str, result: Dict[str, Any]):
+        """Cache a live response in L1 and in Redis with a TTL matching the bar interval"""
+        self._l1[key] = result
+        try:
+            ttl = CACHE_TTL_BY_INTERVAL.get(interval, DEFAULT_CACHE_TTL)
+            await self._redis.setex(key, ttl, orjson.dumps(result))
+        except Exception as e:
+            logger.warning(f"Historical data cache write failed: {e}")
 
     async def get_stock_historical_data(
         self, 
@@ -40,27 +230,24 @@ class HistoricalDataService:
         """
         symbol = symbol.upper()
         
-        # Try APIs in order of preference
-        apis_to_try = [
-            ('finnhub', self._get_finnhub_stock_data),
-            ('quandl', self._get_quandl_stock_data),
-            ('nasdaq_data_link', self._get_nasdaq_data_link_stock_data),
-        ]
+        cache_key = self._cache_key("stock", symbol, days, interval)
+        cached = await self._cache_get(cache_key)
+        if cached:
+            return cached
         
-        for api_name, api_func in apis_to_try:
-            try:
-                result = await api_func(symbol, days, interval)
-                if result and result.get('data'):
-                    logger.info(f"Successfully fetched stock data from {api_name}")
-                    return {
-                        **result,
-                        'source': api_name,
-                        'api_status': 'live',
-                        'timestamp': datetime.now().isoformat()
-                    }
-            except Exception as e:
-                logger.warning(f"Failed to fetch stock data from {api_name}: {e}")
-                continue
+        fetched = await self._fetch_hedged("stock", symbol, days, interval, self._stock_providers)
+        if fetched:
+            api_name, result = fetched
+            logger.info(f"Successfully fetched stock data from {api_name}")
+            response = {
+                **result,
+                'layout': OHLCV_LAYOUT,
+                'source': api_name,
+                'api_status': 'live',
+                'timestamp': datetime.now().isoformat()
+            }
+            await self._cache_set(cache_key, interval, response)
+            return response
         
         # Fallback to mock data
         logger.warning("All stock APIs failed, using mock data")
@@ -77,84 +264,180 @@ class HistoricalDataService:
         """
         symbol = symbol.upper()
         
-        # Try APIs in order of preference
-        apis_to_try = [
-            ('coinapi', self._get_coinapi_crypto_data),
-            ('coingecko', self._get_coingecko_crypto_data),
-            ('cryptocompare', self._get_cryptocompare_crypto_data),
-        ]
+        cache_key = self._cache_key("crypto", symbol, days, interval)
+        cached = await self._cache_get(cache_key)
+        if cached:
+            return cached
         
-        for api_name, api_func in apis_to_try:
-            try:
-                result = await api_func(symbol, days, interval)
-                if result and result.get('data'):
-                    logger.info(f"Successfully fetched crypto data from {api_name}")
-                    return {
-                        **result,
-                        'source': api_name,
-                        'api_status': 'live',
-                        'timestamp': datetime.now().isoformat()
-                    }
-            except Exception as e:
-                logger.warning(f"Failed to fetch crypto data from {api_name}: {e}")
-                continue
+        fetched = await self._fetch_hedged("crypto", symbol, days, interval, self._crypto_providers)
+        if fetched:
+            api_name, result = fetched
+            logger.info(f"Successfully fetched crypto data from {api_name}")
+            response = {
+                **result,
+                'layout': OHLCV_LAYOUT,
+                'source': api_name,
+                'api_status': 'live',
+                'timestamp': datetime.now().isoformat()
+            }
+            await self._cache_set(cache_key, interval, response)
+            return response
         
         # Fallback to mock data
         logger.warning("All crypto APIs failed, using mock data")
         return self._get_mock_crypto_data(symbol, days)
 
+    async def get_stocks_historical_batch(
+        self,
+        symbols: List[str],
+        days: int = 30,
+        interval: str = "1d"
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get stock historical data for several symbols concurrently
+        """
+        return await self._fetch_batch(self.get_stock_historical_data, symbols, days, interval)
+
+    async def get_crypto_historical_batch(
+        self,
+        symbols: List[str],
+        days: int = 30,
+        interval: str = "1d"
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get crypto historical data for several symbols concurrently
+        """
+        return await self._fetch_batch(self.get_crypto_historical_data, symbols, days, interval)
+
+    async def _fetch_batch(
+        self,
+        fetch,
+        symbols: List[str],
+        days: int,
+        interval: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run fetch for each distinct symbol, at most BATCH_CONCURRENCY at a time"""
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        unique_symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        
+        async def fetch_one(symbol: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await fetch(symbol, days, interval)
+        
+        results = await asyncio.gather(
+            *[fetch_one(symbol) for symbol in unique_symbols],
+            return_exceptions=True
+        )
+        
+        return {
+            symbol: {"error": str(result)} if isinstance(result, Exception) else result
+            for symbol, result in zip(unique_symbols, results)
+        }
+
+    async def _fetch_hedged(
+        self,
+        kind: str,
+        symbol: str,
+        days: int,
+        interval: str,
+        apis_to_try: List[Tuple[str, Any]]
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Query providers in preference order, starting the next one as soon as the
+        current one fails or has been pending for PROVIDER_HEDGE_DELAY seconds.
+        Returns (api_name, result) for the first provider with data, or None.
+        """
+        # Skip providers that are still rate limiting us
+        now = time.monotonic()
+        remaining = [(name, func) for name, func in apis_to_try if self._cool_down.get(name, 0) <= now]
+        pending: Dict[asyncio.Task, str] = {}
+        
+        try:
+            while remaining or pending:
+                if remaining:
+                    api_name, api_func = remaining.pop(0)
+                    pending[asyncio.create_task(api_func(symbol, days, interval))] = api_name
+                
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=PROVIDER_HEDGE_DELAY if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for task in done:
+                    api_name = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except httpx.HTTPStatusError as e:
+                        if e.response.status_code == 429:
+                            self._rate_limited(api_name, e.response)
+                        logger.warning(f"Failed to fetch {kind} data from {api_name}: {e}")
+                        continue
+                    except Exception as e:
+                        logger.warning(f"Failed to fetch {kind} data from {api_name}: {e}")
+                        continue
+                    if result and result.get('data', {}).get('close'):
+                        return api_name, result
+            
+            return None
+        finally:
+            # Drop slower providers once we have an answer
+            for task in pending:
+                task.cancel()
+
+    def _rate_limited(self, api_name: str, response: httpx.Response):
+        """Stop trying a provider until its Retry-After (default 60s) has passed"""
+        try:
+            retry_after = int(response.headers.get("Retry-After", "60"))
+        except ValueError:
+            retry_after = 60
+        self._cool_down[api_name] = time.monotonic() + retry_after
+        logger.warning(f"{api_name} rate limited, skipping it for {retry_after}s")
+
     async def _get_finnhub_stock_data(self, symbol: str, days: int, interval: str) -> Dict[str, Any]:
         """Fetch stock data from Finnhub API"""
         if not self.finnhub_api_key:
             raise Exception("Finnhub API key not configured")
         
         # Calculate timestamp range
-        end_time = int(datetime.now().timestamp())
-        start_time = int((datetime.now() - timedelta(days=days)).timestamp())
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.finnhub_base_url}/stock/candle",
-                params={
-                    "symbol": symbol,
-                    "resolution": interval,
-                    "from": start_time,
-                    "to": end_time,
-                    "token": self.finnhub_api_key
-                },
-                timeout=15.0
-            )
+        time_range = _current_time_range(days)
+        
+        client = self._client
+        response = await client.get(
+            f"{self.finnhub_base_url}/stock/candle",
+            params={
+                "symbol": symbol,
+                "resolution": interval,
+                "from": time_range.start_ts,
+                "to": time_range.end_ts,
+                "token": self.finnhub_api_key
+            },
+            timeout=15.0
+        )
+        
+        response.raise_for_status()
+        
+        data = orjson.loads(response.content)
+        
+        if data.get("s") == "ok":  # Success status
+            # Finnhub already returns parallel arrays
+            historical_data = {
+                "timestamps": _iso_timestamps(data.get("t", []), "s"),
+                "open": data.get("o", []),
+                "high": data.get("h", []),
+                "low": data.get("l", []),
+                "close": data.get("c", []),
+                "volume": data.get("v", [])
+            }
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("s") == "ok":  # Success status
-                    candles = data.get("c", [])  # Close prices
-                    highs = data.get("h", [])   # High prices
-                    lows = data.get("l", [])     # Low prices
-                    opens = data.get("o", [])    # Open prices
-                    volumes = data.get("v", [])  # Volumes
-                    timestamps = data.get("t", [])  # Timestamps
-                    
-                    historical_data = []
-                    for i in range(len(candles)):
-                        historical_data.append({
-                            "timestamp": datetime.fromtimestamp(timestamps[i]).isoformat(),
-                            "open": opens[i],
-                            "high": highs[i],
-                            "low": lows[i],
-                            "close": candles[i],
-                            "volume": volumes[i]
-                        })
-                    
-                    return {
-                        "symbol": symbol,
-                        "data": historical_data,
-                        "interval": interval,
-                        "days": days
-                    }
-                else:
-                    raise Exception(f"Finnhub API error: {data.get('s', 'unknown')}")
+            return {
+                "symbol": symbol,
+                "data": historical_data,
+                "interval": interval,
+                "days": days
+            }
+        else:
+            raise Exception(f"Finnhub API error: {data.get('s', 'unknown')}")
 
     async def _get_quandl_stock_data(self, symbol: str, days: int, interval: str) -> Dict[str, Any]:
         """Fetch stock data from Quandl/Nasdaq Data Link API"""
@@ -162,45 +445,45 @@ class HistoricalDataService:
             raise Exception("Quandl API key not configured")
         
         # Calculate date range
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.quandl_base_url}/datasets/WIKI/{symbol}.json",
-                params={
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "api_key": self.quandl_api_key
-                },
-                timeout=15.0
-            )
+        time_range = _current_time_range(days)
+        
+        client = self._client
+        response = await client.get(
+            f"{self.quandl_base_url}/datasets/WIKI/{symbol}.json",
+            params={
+                "start_date": time_range.start_date,
+                "end_date": time_range.end_date,
+                "api_key": self.quandl_api_key
+            },
+            timeout=15.0
+        )
+        
+        response.raise_for_status()
+        
+        data = orjson.loads(response.content)
+        dataset = data.get("dataset", {})
+        
+        if dataset.get("data"):
+            # Transpose rows into one list per named column
+            rows = dataset["data"]
+            columns = dict(zip(dataset.get("column_names", []), map(list, zip(*rows))))
+            missing = [None] * len(rows)
             
-            if response.status_code == 200:
-                data = response.json()
-                dataset = data.get("dataset", {})
-                
-                if dataset.get("data"):
-                    historical_data = []
-                    columns = dataset.get("column_names", [])
-                    
-                    for row in dataset["data"]:
-                        row_dict = dict(zip(columns, row))
-                        historical_data.append({
-                            "timestamp": row_dict.get("Date", ""),
-                            "open": row_dict.get("Open"),
-                            "high": row_dict.get("High"),
-                            "low": row_dict.get("Low"),
-                            "close": row_dict.get("Close"),
-                            "volume": row_dict.get("Volume")
-                        })
-                    
-                    return {
-                        "symbol": symbol,
-                        "data": historical_data,
-                        "interval": interval,
-                        "days": days
-                    }
+            historical_data = {
+                "timestamps": columns.get("Date", [""] * len(rows)),
+                "open": columns.get("Open", missing),
+                "high": columns.get("High", missing),
+                "low": columns.get("Low", missing),
+                "close": columns.get("Close", missing),
+                "volume": columns.get("Volume", missing)
+            }
+            
+            return {
+                "symbol": symbol,
+                "data": historical_data,
+                "interval": interval,
+                "days": days
+            }
 
     async def _get_nasdaq_data_link_stock_data(self, symbol: str, days: int, interval: str) -> Dict[str, Any]:
         """Fetch stock data from Nasdaq Data Link API"""
@@ -217,119 +500,88 @@ class HistoricalDataService:
             raise Exception("CoinAPI key not configured")
         
         # Map symbol to CoinAPI format
-        symbol_mapping = {
-            'BTC': 'BTC/USD',
-            'ETH': 'ETH/USD',
-            'SOL': 'SOL/USD',
-            'ADA': 'ADA/USD',
-            'MATIC': 'MATIC/USD',
-            'AVAX': 'AVAX/USD',
-            'DOGE': 'DOGE/USD',
-            'SHIB': 'SHIB/USD',
-            'LINK': 'LINK/USD',
-            'UNI': 'UNI/USD',
-            'LTC': 'LTC/USD'
-        }
-        
-        coinapi_symbol = symbol_mapping.get(symbol, f"{symbol}/USD")
+        coinapi_symbol = COINAPI_SYMBOL_MAP.get(symbol, f"{symbol}/USD")
         
         # Calculate time range
-        end_time = datetime.now()
-        start_time = end_time - timedelta(days=days)
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.coinapi_base_url}/ohlcv/{coinapi_symbol}/history",
-                params={
-                    "period_id": interval.upper(),
-                    "time_start": start_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                    "time_end": end_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                    "limit": min(days * 24, 10000)  # CoinAPI limit
-                },
-                headers={
-                    "X-CoinAPI-Key": self.coinapi_api_key
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                historical_data = []
-                for item in data:
-                    historical_data.append({
-                        "timestamp": item.get("time_period_start", ""),
-                        "open": item.get("price_open"),
-                        "high": item.get("price_high"),
-                        "low": item.get("price_low"),
-                        "close": item.get("price_close"),
-                        "volume": item.get("volume_traded")
-                    })
-                
-                return {
-                    "symbol": symbol,
-                    "data": historical_data,
-                    "interval": interval,
-                    "days": days
-                }
+        time_range = _current_time_range(days)
+        
+        client = self._client
+        response = await client.get(
+            f"{self.coinapi_base_url}/ohlcv/{coinapi_symbol}/history",
+            params={
+                "period_id": interval.upper(),
+                "time_start": time_range.start_iso,
+                "time_end": time_range.end_iso,
+                "limit": min(days * 24, 10000)  # CoinAPI limit
+            },
+            headers={
+                "X-CoinAPI-Key": self.coinapi_api_key
+            },
+            timeout=15.0
+        )
+        
+        response.raise_for_status()
+        
+        bars = _coinapi_decoder.decode(response.content)
+        
+        historical_data = {
+            "timestamps": [bar.time_period_start for bar in bars],
+            "open": [bar.price_open for bar in bars],
+            "high": [bar.price_high for bar in bars],
+            "low": [bar.price_low for bar in bars],
+            "close": [bar.price_close for bar in bars],
+            "volume": [bar.volume_traded for bar in bars]
+        }
+        
+        return {
+            "symbol": symbol,
+            "data": historical_data,
+            "interval": interval,
+            "days": days
+        }
 
     async def _get_coingecko_crypto_data(self, symbol: str, days: int, interval: str) -> Dict[str, Any]:
         """Fetch crypto data from CoinGecko API"""
-        symbol_mapping = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'SOL': 'solana',
-            'ADA': 'cardano',
-            'MATIC': 'matic-network',
-            'AVAX': 'avalanche-2',
-            'DOGE': 'dogecoin',
-            'SHIB': 'shiba-inu',
-            'LINK': 'chainlink',
-            'UNI': 'uniswap',
-            'LTC': 'litecoin'
+        coin_id = COINGECKO_ID_MAP.get(symbol, symbol.lower())
+        
+        client = self._client
+        response = await client.get(
+            f"{self.coingecko_base_url}/coins/{coin_id}/market_chart",
+            params={
+                "vs_currency": "usd",
+                "days": days,
+                "interval": "daily" if interval == "1d" else "hourly"
+            },
+            timeout=15.0
+        )
+        
+        response.raise_for_status()
+        
+        data = orjson.loads(response.content)
+        
+        prices = data.get("prices", [])
+        volumes = data.get("total_volumes", [])
+        
+        closes = [price for _, price in prices]
+        volume_values = [volume for _, volume in volumes[:len(prices)]]
+        volume_values += [0] * (len(prices) - len(volume_values))
+        
+        # Generate OHLC from price (simplified)
+        historical_data = {
+            "timestamps": _iso_timestamps([ts for ts, _ in prices], "ms"),
+            "open": [price * 0.999 for price in closes],
+            "high": [price * 1.001 for price in closes],
+            "low": [price * 0.998 for price in closes],
+            "close": closes,
+            "volume": volume_values
         }
         
-        coin_id = symbol_mapping.get(symbol, symbol.lower())
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.coingecko_base_url}/coins/{coin_id}/market_chart",
-                params={
-                    "vs_currency": "usd",
-                    "days": days,
-                    "interval": "daily" if interval == "1d" else "hourly"
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                prices = data.get("prices", [])
-                volumes = data.get("total_volumes", [])
-                
-                historical_data = []
-                for i in range(len(prices)):
-                    timestamp = datetime.fromtimestamp(prices[i][0] / 1000).isoformat()
-                    price = prices[i][1]
-                    volume = volumes[i][1] if i < len(volumes) else 0
-                    
-                    # Generate OHLC from price (simplified)
-                    historical_data.append({
-                        "timestamp": timestamp,
-                        "open": price * 0.999,  # Simplified OHLC
-                        "high": price * 1.001,
-                        "low": price * 0.998,
-                        "close": price,
-                        "volume": volume
-                    })
-                
-                return {
-                    "symbol": symbol,
-                    "data": historical_data,
-                    "interval": interval,
-                    "days": days
-                }
+        return {
+            "symbol": symbol,
+            "data": historical_data,
+            "interval": interval,
+            "days": days
+        }
 
     async def _get_cryptocompare_crypto_data(self, symbol: str, days: int, interval: str) -> Dict[str, Any]:
         """Fetch crypto data from CryptoCompare API"""
@@ -342,104 +594,84 @@ class HistoricalDataService:
         
         crypto_interval = interval_mapping.get(interval, "day")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.cryptocompare_base_url}/v2/histoday",
-                params={
-                    "fsym": symbol,
-                    "tsym": "USD",
-                    "limit": days,
-                    "aggregate": 1
-                },
-                timeout=15.0
-            )
+        client = self._client
+        response = await client.get(
+            f"{self.cryptocompare_base_url}/v2/histoday",
+            params={
+                "fsym": symbol,
+                "tsym": "USD",
+                "limit": days,
+                "aggregate": 1
+            },
+            timeout=15.0
+        )
+        
+        response.raise_for_status()
+        
+        data = _cryptocompare_decoder.decode(response.content)
+        
+        if data.Response == "Success":
+            bars = data.Data
+            historical_data = {
+                "timestamps": _iso_timestamps([bar.time for bar in bars], "s"),
+                "open": [bar.open for bar in bars],
+                "high": [bar.high for bar in bars],
+                "low": [bar.low for bar in bars],
+                "close": [bar.close for bar in bars],
+                "volume": [bar.volumeto for bar in bars]
+            }
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("Response") == "Success":
-                    historical_data = []
-                    for item in data.get("Data", []):
-                        historical_data.append({
-                            "timestamp": datetime.fromtimestamp(item.get("time", 0)).isoformat(),
-                            "open": item.get("open"),
-                            "high": item.get("high"),
-                            "low": item.get("low"),
-                            "close": item.get("close"),
-                            "volume": item.get("volumeto")
-                        })
-                    
-                    return {
-                        "symbol": symbol,
-                        "data": historical_data,
-                        "interval": interval,
-                        "days": days
-                    }
+            return {
+                "symbol": symbol,
+                "data": historical_data,
+                "interval": interval,
+                "days": days
+            }
 
-    def _get_mock_stock_data(self, symbol: str, days: int) -> Dict[str, Any]:
-        """Fallback mock stock data"""
-        import random
+    def _generate_mock_ohlcv(
+        self,
+        days: int,
+        base_price: float,
+        max_change: float,
+        high_range: Tuple[float, float],
+        low_range: Tuple[float, float]
+    ) -> Dict[str, List[Any]]:
+        """Generate mock daily OHLCV columns in one vectorised pass"""
+        rng = self._rng
         
-        base_price = 150.0 if symbol == "AAPL" else 300.0 if symbol == "MSFT" else random.uniform(50.0, 500.0)
+        changes = rng.uniform(-max_change, max_change, days)
+        prices = base_price * (1 + changes * np.arange(days) / days)
+        now = datetime.now()
         
-        data = []
-        for i in range(days):
-            date = datetime.now() - timedelta(days=days-i-1)
-            price_change = random.uniform(-0.05, 0.05)
-            price = base_price * (1 + price_change * (i / days))
-            
-            high = price * random.uniform(1.0, 1.03)
-            low = price * random.uniform(0.97, 1.0)
-            open_price = price * random.uniform(0.98, 1.02)
-            close_price = price
-            volume = random.randint(1000000, 10000000)
-            
-            data.append({
-                "timestamp": date.isoformat(),
-                "open": round(open_price, 2),
-                "high": round(high, 2),
-                "low": round(low, 2),
-                "close": round(close_price, 2),
-                "volume": volume
-            })
+        return {
+            "timestamps": [(now - timedelta(days=days - i - 1)).isoformat() for i in range(days)],
+            "open": np.round(prices * rng.uniform(0.98, 1.02, days), 2).tolist(),
+            "high": np.round(prices * rng.uniform(*high_range, days), 2).tolist(),
+            "low": np.round(prices * rng.uniform(*low_range, days), 2).tolist(),
+            "close": np.round(prices, 2).tolist(),
+            "volume": rng.integers(1000000, 10000000, days, endpoint=True).tolist()
+        }
+
+    def _get_mock_stock_data(self, symbol: str, days: int) -> Dict[str, Any]:
+        """Fallback mock stock data"""
+        base_price = 150.0 if symbol == "AAPL" else 300.0 if symbol == "MSFT" else self._rng.uniform(50.0, 500.0)
         
         return {
             "symbol": symbol,
-            "data": data,
+            "data": self._generate_mock_ohlcv(days, base_price, 0.05, (1.0, 1.03), (0.97, 1.0)),
+            "layout": OHLCV_LAYOUT,
             "source": "mock",
             "api_status": "fallback"
         }
 
     def _get_mock_crypto_data(self, symbol: str, days: int) -> Dict[str, Any]:
         """Fallback mock crypto data"""
-        import random
-        
-        base_price = 45000.0 if symbol == "BTC" else 3200.0 if symbol == "ETH" else random.uniform(0.01, 1000.0)
-        
-        data = []
-        for i in range(days):
-            date = datetime.now() - timedelta(days=days-i-1)
-            price_change = random.uniform(-0.1, 0.1)
-            price = base_price * (1 + price_change * (i / days))
-            
-            high = price * random.uniform(1.0, 1.05)
-            low = price * random.uniform(0.95, 1.0)
-            open_price = price * random.uniform(0.98, 1.02)
-            close_price = price
-            volume = random.randint(1000000, 10000000)
-            
-            data.append({
-                "timestamp": date.isoformat(),
-                "open": round(open_price, 2),
-                "high": round(high, 2),
-                "low": round(low, 2),
-                "close": round(close_price, 2),
-                "volume": volume
-            })
+        base_price = 45000.0 if symbol == "BTC" else 3200.0 if symbol == "ETH" else self._rng.uniform(0.01, 1000.0)
         
         return {
             "symbol": symbol,
-            "data": data,
+            "data": self._generate_mock_ohlcv(days, base_price, 0.1, (1.0, 1.05), (0.95, 1.0)),
+            "layout": OHLCV_LAYOUT,
             "source": "mock",
             "api_status": "fallback"
         }
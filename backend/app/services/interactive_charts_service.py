@@ -1,26 +1,164 @@
 import logging
+import numba
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Mapping, Optional, Tuple, Any
+from types import MappingProxyType
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from cachetools import TTLCache
 import json
 
 from app.db import models
+from app.services.cache_service import CacheManager, get_cache_service
 from app.services.market_data_service import MarketDataService
 from app.services.technical_analysis_service import TechnicalAnalysisService
 
 logger = logging.getLogger(__name__)
 
+VOLUME_PROFILE_LEVELS = 50
+
+# Shared across requests since a service instance only lives for one request.
+# Prices stay sub-second fresh; history is keyed by calendar day so the
+# datetime.now() based default windows hit the same entry.
+_price_cache: TTLCache = TTLCache(maxsize=1024, ttl=1.0)
+_history_cache: TTLCache = TTLCache(maxsize=256, ttl=60)
+
+PRICED_ORDER_TYPES = frozenset({"limit", "stop", "stop_limit"})
+VALID_ORDER_TYPES = PRICED_ORDER_TYPES | {"market"}
+
+MARKET_DEPTH_LEVELS = 10
+# Slightly longer than the precompute schedule so entries never lapse between runs
+PATTERN_CACHE_TTL = 120
+_rng = np.random.default_rng()
+
+# Bars either side a swing high/low must dominate, and how close two swing
+# prices must be (as a fraction) to count as the same level
+PATTERN_EXTREMA_ORDER = 2
+PATTERN_TOLERANCE = 0.02
+
+
+def _rolling_windows(values: np.ndarray, n: int) -> np.ndarray:
+    """Zero-copy (len - n + 1, n) view of every n-length window."""
+    return np.lib.stride_tricks.sliding_window_view(values, n)
+
+
+def _local_extrema(values: np.ndarray, order: int = PATTERN_EXTREMA_ORDER, peaks: bool = True) -> np.ndarray:
+    """Indices of bars that are the max (or min) of the centred 2*order+1 window."""
+    n = 2 * order + 1
+    if len(values) < n:
+        return np.empty(0, dtype=np.intp)
+    windows = _rolling_windows(values, n)
+    centre = values[order:len(values) - order]
+    extreme = windows.max(axis=1) if peaks else windows.min(axis=1)
+    return np.flatnonzero(centre == extreme) + order
+
+
+def _iso_labels(index: pd.DatetimeIndex) -> List[str]:
+    """ISO-8601 strings for a whole index in one vectorised strftime."""
+    if index.tz is None:
+        return index.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+    # strftime's %z has no colon, so normalise to UTC and spell the offset out
+    return index.tz_convert('UTC').strftime('%Y-%m-%dT%H:%M:%S+00:00').tolist()
+
+
+def _bar_labels(data: pd.DataFrame, idx: np.ndarray) -> List[str]:
+    """ISO timestamps for the given bar positions."""
+    return _iso_labels(data.index[idx])
+
+
+@lru_cache(maxsize=512)
+def _support_resistance_levels(high: Tuple[float, ...], low: Tuple[float, ...]) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Five lowest support and five highest resistance swing levels."""
+    high_arr = np.asarray(high, dtype=np.float64)
+    low_arr = np.asarray(low, dtype=np.float64)
+    
+    # Find local highs and lows: bars that are the extreme of the
+    # centred 5-bar window around them
+    resistance_levels = high_arr[_local_extrema(high_arr, peaks=True)]
+    support_levels = low_arr[_local_extrema(low_arr, peaks=False)]
+    
+    # np.unique removes duplicates and sorts ascending
+    return (
+        tuple(np.unique(support_levels)[:5].tolist()),
+        tuple(np.unique(resistance_levels)[::-1][:5].tolist())
+    )
+
+
+@lru_cache(maxsize=1)
+def _market_hours(day: date) -> Mapping[str, Any]:
+    """Read-only market hours for a trading day; keyed by date so it rolls over daily."""
+    return MappingProxyType({
+        "market_open": "09:30",
+        "market_close": "16:00",
+        "timezone": "EST",
+        "is_market_open": True,  # This would be calculated based on current time
+        "next_open": "09:30",
+        "next_close": "16:00"
+    })
+
+
+@numba.njit(cache=True)
+def _volume_profile_kernel(low: np.ndarray, high: np.ndarray, volume: np.ndarray,
+                           levels: np.ndarray) -> np.ndarray:
+    """Spread each bar's volume over the price levels inside its high/low range."""
+    out = np.zeros(levels.shape[0])
+    for i in range(low.shape[0]):
+        price_range = high[i] - low[i]
+        # Flat bars carry no per-price volume
+        if price_range <= 0:
+            continue
+        per_price = volume[i] / price_range
+        for j in range(levels.shape[0]):
+            # Levels are ascending, nothing further up can fall in this bar
+            if levels[j] > high[i]:
+                break
+            if levels[j] >= low[i]:
+                out[j] += per_price
+    return out
+
+
 class InteractiveChartsService:
     def __init__(self, db: Session):
         self.db = db
         self.market_data_service = MarketDataService(db)
         self.technical_service = TechnicalAnalysisService(db)
     
+    def _cached_price(self, symbol: str):
+        """Current price for a symbol, memoized for a second."""
+        price = _price_cache.get(symbol)
+        if price is None:
+            price = self.market_data_service.get_current_price(symbol)
+            # Misses are not cached so a provider hiccup is retried next call
+            if price:
+                _price_cache[symbol] = price
+        return price
+    
+    def prefetch_prices(self, symbols: List[str]) -> Dict[str, Any]:
+        """Warm the price cache for several symbols with one batched lookup."""
+        missing = [symbol for symbol in symbols if symbol not in _price_cache]
+        if missing:
+            for symbol, price in self.market_data_service.get_current_prices(missing).items():
+                if price:
+                    _price_cache[symbol] = price
+        return {symbol: _price_cache.get(symbol) for symbol in symbols}
+    
+    def _cached_history(self, symbol: str, start_date: datetime, end_date: datetime):
+        """Historical prices for a symbol, memoized per calendar-day window."""
+        key = (symbol, start_date.date(), end_date.date())
+        data = _history_cache.get(key)
+        if data is None:
+            data = self.market_data_service.get_historical_data(symbol, start_date, end_date)
+            if data is not None and not data.empty:
+                _history_cache[key] = data
+        return data
+    
     def get_chart_data(self, symbol: str, timeframe: str = "1d", 
                       start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
-                      indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+                      indicators: Optional[List[str]] = None,
+                      current_price: Optional[Any] = None) -> Dict[str, Any]:
         """Get comprehensive chart data with OHLCV and technical indicators."""
         try:
             if not end_date:
@@ -30,47 +168,52 @@ class InteractiveChartsService:
                 start_date = end_date - timedelta(days=365)
             
             # Get price data
-            price_data = self.market_data_service.get_historical_data(symbol, start_date, end_date)
+            price_data = self._cached_history(symbol, start_date, end_date)
             if price_data is None or price_data.empty:
                 return {"error": "No price data available"}
             
             # Calculate technical indicators
             technical_data = self.technical_service.calculate_technical_indicators(symbol, price_data)
             
-            # Combine data
-            chart_data = pd.concat([price_data, technical_data], axis=1)
-            chart_data = chart_data.dropna()
-            
-            # Format OHLCV data
-            ohlcv_data = []
-            for index, row in chart_data.iterrows():
-                ohlcv_data.append({
-                    "timestamp": index.isoformat(),
-                    "open": float(row['open']),
-                    "high": float(row['high']),
-                    "low": float(row['low']),
-                    "close": float(row['close']),
-                    "volume": int(row['volume'])
-                })
+            # Combine data by attaching indicator columns to a shallow copy of
+            # the prices (which may be the shared cached frame). Assignment
+            # aligns on the index; bars missing an indicator become NaN and
+            # are dropped with everything else.
+            chart_data = price_data.copy(deep=False)
+            for column in technical_data.columns:
+                chart_data[column] = technical_data[column]
+            chart_data.dropna(inplace=True)
+            
+            # Columnar OHLCV: one array per field instead of a dict per bar.
+            # The arrays stay NumPy and are serialized by orjson at the route.
+            timestamps = _iso_labels(chart_data.index)
+            ohlcv_data = {
+                "timestamps": timestamps,
+                "open": chart_data['open'].to_numpy(dtype=np.float64),
+                "high": chart_data['high'].to_numpy(dtype=np.float64),
+                "low": chart_data['low'].to_numpy(dtype=np.float64),
+                "close": chart_data['close'].to_numpy(dtype=np.float64),
+                "volume": chart_data['volume'].to_numpy(dtype=np.int64)
+            }
             
             # Format technical indicators
             indicators_data = {}
             if indicators:
                 for indicator in indicators:
                     if indicator in chart_data.columns:
+                        column = chart_data[indicator].astype('float64')
+                        values = column.astype(object).where(column.notna(), None).tolist()
                         indicators_data[indicator] = [
-                            {
-                                "timestamp": index.isoformat(),
-                                "value": float(row[indicator]) if pd.notna(row[indicator]) else None
-                            }
-                            for index, row in chart_data.iterrows()
+                            {"timestamp": t, "value": v}
+                            for t, v in zip(timestamps, values)
                         ]
             
             # Calculate chart statistics
             stats = self._calculate_chart_statistics(chart_data)
             
-            # Get current price
-            current_price = self.market_data_service.get_current_price(symbol)
+            # Get current price unless the caller already batch-fetched it
+            if current_price is None:
+                current_price = self._cached_price(symbol)
             
             return {
                 "symbol": symbol,
@@ -88,32 +231,26 @@ class InteractiveChartsService:
             logger.error(f"Error getting chart data: {e}")
             return {"error": str(e)}
     
-    def get_order_placement_data(self, symbol: str, user_id: str) -> Dict[str, Any]:
+    def get_order_placement_data(self, symbol: str, user_id: str,
+                                 current_price: Optional[Any] = None) -> Dict[str, Any]:
         """Get data needed for order placement on charts."""
         try:
-            # Get current price
-            current_price = self.market_data_service.get_current_price(symbol)
+            # Get current price unless the caller already batch-fetched it
+            if current_price is None:
+                current_price = self._cached_price(symbol)
             if not current_price:
                 return {"error": "Current price not available"}
             
-            # Get user's portfolio
-            portfolio = self.db.query(models.Portfolio).filter(
-                models.Portfolio.user_id == user_id
-            ).first()
+            # Get user's portfolio and holding for this symbol
+            portfolio, holding = self._get_portfolio_and_holding(user_id, symbol)
             
             if not portfolio:
                 return {"error": "Portfolio not found"}
             
-            # Get user's holdings for this symbol
-            holding = self.db.query(models.Holding).filter(
-                models.Holding.portfolio_id == portfolio.id,
-                models.Holding.symbol == symbol
-            ).first()
-            
             # Get recent price levels for support/resistance
             end_date = datetime.now()
             start_date = end_date - timedelta(days=30)
-            price_data = self.market_data_service.get_historical_data(symbol, start_date, end_date)
+            price_data = self._cached_history(symbol, start_date, end_date)
             
             support_resistance = self._calculate_support_resistance(price_data)
             
@@ -148,28 +285,25 @@ class InteractiveChartsService:
                 if field not in order_data:
                     return {"error": f"Missing required field: {field}"}
             
-            # Get portfolio
-            portfolio = self.db.query(models.Portfolio).filter(
-                models.Portfolio.user_id == user_id
-            ).first()
+            order_type = order_data["order_type"]
+            if order_type not in VALID_ORDER_TYPES:
+                return {"error": "Invalid order type"}
+            
+            # Get portfolio and any existing holding for the symbol
+            portfolio, holding = self._get_portfolio_and_holding(user_id, order_data["symbol"])
             
             if not portfolio:
                 return {"error": "Portfolio not found"}
             
             # Get current price
-            current_price = self.market_data_service.get_current_price(order_data["symbol"])
+            current_price = self._cached_price(order_data["symbol"])
             if not current_price:
                 return {"error": "Current price not available"}
             
-            # Calculate order value
-            if order_data["order_type"] == "market":
-                order_price = current_price
-            elif order_data["order_type"] in ["limit", "stop", "stop_limit"]:
-                if "price" not in order_data:
-                    return {"error": "Price required for limit/stop orders"}
-                order_price = order_data["price"]
-            else:
-                return {"error": "Invalid order type"}
+            # Market orders fill at the current price, the rest at the one given
+            order_price = order_data.get("price") if order_type in PRICED_ORDER_TYPES else current_price
+            if order_price is None:
+                return {"error": "Price required for limit/stop orders"}
             
             order_value = order_data["quantity"] * order_price
             
@@ -179,11 +313,6 @@ class InteractiveChartsService:
             
             # Check if user has sufficient shares for sell orders
             if order_data["side"] == "sell":
-                holding = self.db.query(models.Holding).filter(
-                    models.Holding.portfolio_id == portfolio.id,
-                    models.Holding.symbol == order_data["symbol"]
-                ).first()
-                
                 if not holding or holding.quantity < order_data["quantity"]:
                     return {"error": "Insufficient shares"}
             
@@ -198,9 +327,10 @@ class InteractiveChartsService:
                 status="pending"
             )
             
+            # Flush assigns the id via INSERT ... RETURNING; _process_order
+            # commits the order together with the fill
             self.db.add(order)
-            self.db.commit()
-            self.db.refresh(order)
+            self.db.flush()
             
             # Process order immediately (in a real system, this would go through an order management system)
             self._process_order(order, portfolio)
@@ -224,8 +354,40 @@ class InteractiveChartsService:
             if not start_date:
                 start_date = end_date - timedelta(days=90)
             
+            # Patterns only move when a new bar closes; the precompute task
+            # keeps watched symbols warm so most requests stop here
+            cache = CacheManager(get_cache_service())
+            window = f"{start_date.date().isoformat()}:{end_date.date().isoformat()}"
+            cached = cache.get_cached_chart_patterns(symbol, window)
+            if cached is not None:
+                return cached
+            
+            result = self._detect_chart_patterns(symbol, start_date, end_date)
+            if "error" not in result:
+                cache.cache_chart_patterns(symbol, window, result, ttl=PATTERN_CACHE_TTL)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error detecting chart patterns: {e}")
+            return {"error": str(e)}
+    
+    def refresh_chart_patterns(self, symbol: str) -> bool:
+        """Recompute the default chart-pattern window for a symbol and store it."""
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=90)
+        result = self._detect_chart_patterns(symbol, start_date, end_date)
+        if "error" in result:
+            return False
+        
+        window = f"{start_date.date().isoformat()}:{end_date.date().isoformat()}"
+        cache = CacheManager(get_cache_service())
+        return cache.cache_chart_patterns(symbol, window, result, ttl=PATTERN_CACHE_TTL)
+    
+    def _detect_chart_patterns(self, symbol: str, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Run every pattern detector over a symbol's price window."""
+        try:
             # Get price data
-            price_data = self.market_data_service.get_historical_data(symbol, start_date, end_date)
+            price_data = self._cached_history(symbol, start_date, end_date)
             if price_data is None or price_data.empty:
                 return {"error": "No price data available"}
             
@@ -259,28 +421,21 @@ class InteractiveChartsService:
                 start_date = end_date - timedelta(days=30)
             
             # Get price data
-            price_data = self.market_data_service.get_historical_data(symbol, start_date, end_date)
+            price_data = self._cached_history(symbol, start_date, end_date)
             if price_data is None or price_data.empty:
                 return {"error": "No price data available"}
             
             # Calculate volume profile
-            price_levels = np.linspace(price_data['low'].min(), price_data['high'].max(), 50)
-            volume_profile = []
-            
-            for level in price_levels:
-                # Find volume at this price level
-                level_volume = 0
-                for _, row in price_data.iterrows():
-                    if row['low'] <= level <= row['high']:
-                        # Distribute volume across price range
-                        price_range = row['high'] - row['low']
-                        if price_range > 0:
-                            level_volume += row['volume'] / price_range
-                
-                volume_profile.append({
-                    "price": float(level),
-                    "volume": float(level_volume)
-                })
+            low = price_data['low'].to_numpy(dtype=np.float64)
+            high = price_data['high'].to_numpy(dtype=np.float64)
+            volume = price_data['volume'].to_numpy(dtype=np.float64)
+            price_levels = np.linspace(low.min(), high.max(), VOLUME_PROFILE_LEVELS)
+            level_volume = _volume_profile_kernel(low, high, volume, price_levels)
+            
+            volume_profile = [
+                {"price": p, "volume": v}
+                for p, v in zip(price_levels.tolist(), level_volume.tolist())
+            ]
             
             # Find POC (Point of Control) - price level with highest volume
             poc = max(volume_profile, key=lambda x: x['volume'])
@@ -303,33 +458,25 @@ class InteractiveChartsService:
             # In a real implementation, this would connect to a market data provider
             # For now, we'll create mock data
             
-            current_price = self.market_data_service.get_current_price(symbol)
+            current_price = self._cached_price(symbol)
             if not current_price:
                 return {"error": "Current price not available"}
             
-            # Generate mock order book data
-            bids = []
-            asks = []
-            
-            # Generate bids (buy orders)
-            for i in range(10):
-                price = current_price * (1 - (i + 1) * 0.001)
-                volume = np.random.randint(100, 1000)
-                bids.append({
-                    "price": float(price),
-                    "volume": volume,
-                    "orders": np.random.randint(1, 10)
-                })
-            
-            # Generate asks (sell orders)
-            for i in range(10):
-                price = current_price * (1 + (i + 1) * 0.001)
-                volume = np.random.randint(100, 1000)
-                asks.append({
-                    "price": float(price),
-                    "volume": volume,
-                    "orders": np.random.randint(1, 10)
-                })
+            # Generate mock order book data, ten levels either side of the price
+            steps = np.arange(1, MARKET_DEPTH_LEVELS + 1) * 0.001
+            bid_prices = (float(current_price) * (1 - steps)).tolist()
+            ask_prices = (float(current_price) * (1 + steps)).tolist()
+            volumes = _rng.integers(100, 1000, size=(2, MARKET_DEPTH_LEVELS)).tolist()
+            orders = _rng.integers(1, 10, size=(2, MARKET_DEPTH_LEVELS)).tolist()
+            
+            bids = [
+                {"price": p, "volume": v, "orders": o}
+                for p, v, o in zip(bid_prices, volumes[0], orders[0])
+            ]
+            asks = [
+                {"price": p, "volume": v, "orders": o}
+                for p, v, o in zip(ask_prices, volumes[1], orders[1])
+            ]
             
             return {
                 "symbol": symbol,
@@ -346,26 +493,36 @@ class InteractiveChartsService:
     def _calculate_chart_statistics(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Calculate basic chart statistics."""
         try:
+            close = data['close'].to_numpy(dtype=np.float64)
+            volume = data['volume'].to_numpy(dtype=np.float64)
+            high_max = float(data['high'].to_numpy(dtype=np.float64).max())
+            low_min = float(data['low'].to_numpy(dtype=np.float64).min())
+            start_price = float(close[0])
+            end_price = float(close[-1])
+            change = end_price - start_price
+            returns = np.diff(close) / close[:-1]
+            returns_std = float(returns.std(ddof=1)) if len(returns) > 1 else float('nan')
+            
             stats = {
                 "price_range": {
-                    "high": float(data['high'].max()),
-                    "low": float(data['low'].min()),
-                    "range": float(data['high'].max() - data['low'].min())
+                    "high": high_max,
+                    "low": low_min,
+                    "range": high_max - low_min
                 },
                 "volume_stats": {
-                    "total_volume": int(data['volume'].sum()),
-                    "average_volume": float(data['volume'].mean()),
-                    "max_volume": int(data['volume'].max())
+                    "total_volume": int(volume.sum()),
+                    "average_volume": float(volume.mean()),
+                    "max_volume": int(volume.max())
                 },
                 "price_change": {
-                    "start_price": float(data['close'].iloc[0]),
-                    "end_price": float(data['close'].iloc[-1]),
-                    "change": float(data['close'].iloc[-1] - data['close'].iloc[0]),
-                    "change_percent": float((data['close'].iloc[-1] - data['close'].iloc[0]) / data['close'].iloc[0] * 100)
+                    "start_price": start_price,
+                    "end_price": end_price,
+                    "change": change,
+                    "change_percent": change / start_price * 100
                 },
                 "volatility": {
-                    "daily_returns_std": float(data['close'].pct_change().std()),
-                    "annualized_volatility": float(data['close'].pct_change().std() * np.sqrt(252))
+                    "daily_returns_std": returns_std,
+                    "annualized_volatility": returns_std * np.sqrt(252)
                 }
             }
             
@@ -381,48 +538,117 @@ class InteractiveChartsService:
             if data.empty:
                 return {"support": [], "resistance": []}
             
-            # Find local highs and lows
-            highs = data['high'].rolling(window=5, center=True).max() == data['high']
-            lows = data['low'].rolling(window=5, center=True).min() == data['low']
-            
-            resistance_levels = data[highs]['high'].tolist()
-            support_levels = data[lows]['low'].tolist()
-            
-            # Remove duplicates and sort
-            resistance_levels = sorted(list(set(resistance_levels)), reverse=True)[:5]
-            support_levels = sorted(list(set(support_levels)))[:5]
-            
-            return {
-                "support": [float(level) for level in support_levels],
-                "resistance": [float(level) for level in resistance_levels]
-            }
+            support, resistance = _support_resistance_levels(
+                tuple(data['high'].to_numpy(dtype=np.float64).tolist()),
+                tuple(data['low'].to_numpy(dtype=np.float64).tolist())
+            )
+            return {"support": list(support), "resistance": list(resistance)}
             
         except Exception as e:
             logger.error(f"Error calculating support/resistance: {e}")
             return {"support": [], "resistance": []}
     
+    def _get_portfolio_and_holding(self, user_id: str, symbol: str) -> Tuple[Optional[models.Portfolio], Optional[models.Holding]]:
+        """Load a user's portfolio and their holding in a symbol in one query."""
+        row = self.db.query(models.Portfolio, models.Holding).outerjoin(
+            models.Holding,
+            and_(
+                models.Holding.portfolio_id == models.Portfolio.id,
+                models.Holding.symbol == symbol
+            )
+        ).filter(
+            models.Portfolio.user_id == user_id
+        ).first()
+        
+        if not row:
+            return None, None
+        return row[0], row[1]
+    
     def _get_market_hours(self) -> Dict[str, Any]:
         """Get market hours information."""
-        return {
-            "market_open": "09:30",
-            "market_close": "16:00",
-            "timezone": "EST",
-            "is_market_open": True,  # This would be calculated based on current time
-            "next_open": "09:30",
-            "next_close": "16:00"
-        }
+        return dict(_market_hours(date.today()))
     
     def _detect_head_and_shoulders(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
         """Detect head and shoulders patterns."""
         patterns = []
-        # Simplified implementation
-        # In a real system, this would use more sophisticated pattern recognition
+        high = data['high'].to_numpy(dtype=np.float64)
+        low = data['low'].to_numpy(dtype=np.float64)
+        
+        # Every run of three consecutive swing highs (or lows) is a candidate;
+        # the middle one is the head, the outer two the shoulders
+        for pattern_type, prices, peaks in (
+            ("head_and_shoulders", high, True),
+            ("inverse_head_and_shoulders", low, False)
+        ):
+            swings = _local_extrema(prices, peaks=peaks)
+            if len(swings) < 3:
+                continue
+            left, head, right = swings[:-2], swings[1:-1], swings[2:]
+            p_left, p_head, p_right = prices[left], prices[head], prices[right]
+            
+            if peaks:
+                head_stands_out = (p_head > p_left) & (p_head > p_right)
+            else:
+                head_stands_out = (p_head < p_left) & (p_head < p_right)
+            shoulders_level = np.abs(p_left - p_right) <= PATTERN_TOLERANCE * np.abs(p_head)
+            found = np.flatnonzero(head_stands_out & shoulders_level)
+            
+            starts = _bar_labels(data, left[found])
+            ends = _bar_labels(data, right[found])
+            for start, end, head_price, neckline in zip(
+                starts, ends, p_head[found].tolist(), ((p_left[found] + p_right[found]) / 2).tolist()
+            ):
+                patterns.append({
+                    "type": pattern_type,
+                    "start": start,
+                    "end": end,
+                    "head": head_price,
+                    "shoulder_level": neckline
+                })
+        
         return patterns
     
     def _detect_double_top_bottom(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
         """Detect double top and bottom patterns."""
         patterns = []
-        # Simplified implementation
+        high = data['high'].to_numpy(dtype=np.float64)
+        low = data['low'].to_numpy(dtype=np.float64)
+        
+        # Consecutive swing highs (lows) at about the same price, with a
+        # pullback of more than the tolerance in between
+        for pattern_type, prices, opposite, peaks in (
+            ("double_top", high, low, True),
+            ("double_bottom", low, high, False)
+        ):
+            swings = _local_extrema(prices, peaks=peaks)
+            if len(swings) < 2:
+                continue
+            first, second = swings[:-1], swings[1:]
+            level = (prices[first] + prices[second]) / 2
+            same_level = np.abs(prices[first] - prices[second]) <= PATTERN_TOLERANCE * level
+            
+            # Deepest opposite price between each pair of swings
+            if peaks:
+                between = np.minimum.reduceat(opposite, swings)[:-1]
+                pullback = (level - between) / level
+            else:
+                between = np.maximum.reduceat(opposite, swings)[:-1]
+                pullback = (between - level) / level
+            found = np.flatnonzero(same_level & (pullback > PATTERN_TOLERANCE))
+            
+            starts = _bar_labels(data, first[found])
+            ends = _bar_labels(data, second[found])
+            for start, end, price, pivot in zip(
+                starts, ends, level[found].tolist(), between[found].tolist()
+            ):
+                patterns.append({
+                    "type": pattern_type,
+                    "start": start,
+                    "end": end,
+                    "level": price,
+                    "pivot": pivot
+                })
+        
         return patterns
     
     def _detect_triangles(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
@@ -449,13 +675,19 @@ class InteractiveChartsService:
             # In a real system, this would go through an order management system
             # For now, we'll just update the portfolio directly
             
+            # Lock the portfolio, then the holding, so concurrent orders apply
+            # one after another. Both rows are already in the session, so
+            # populate_existing() is needed to re-read the values committed
+            # before the lock was granted instead of keeping the stale ones.
+            portfolio = self.db.query(models.Portfolio).filter(
+                models.Portfolio.id == portfolio.id
+            ).populate_existing().with_for_update().one()
+            holding = self.db.query(models.Holding).filter(
+                models.Holding.portfolio_id == portfolio.id,
+                models.Holding.symbol == order.symbol
+            ).populate_existing().with_for_update().first()
+            
             if order.transaction_type == "buy":
-                # Check if holding exists
-                holding = self.db.query(models.Holding).filter(
-                    models.Holding.portfolio_id == portfolio.id,
-                    models.Holding.symbol == order.symbol
-                ).first()
-                
                 if holding:
                     # Update existing holding
                     total_cost = (holding.quantity * holding.average_price) + (order.quantity * order.price)
@@ -477,11 +709,6 @@ class InteractiveChartsService:
                 
             elif order.transaction_type == "sell":
                 # Update holding
-                holding = self.db.query(models.Holding).filter(
-                    models.Holding.portfolio_id == portfolio.id,
-                    models.Holding.symbol == order.symbol
-                ).first()
-                
                 if holding:
                     holding.quantity -= order.quantity
                     if holding.quantity <= 0:
@@ -1,21 +1,55 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, func, insert, select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.db import models, schemas
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import logging
+import numpy as np
+import pandas as pd
 import requests
 import os
 from app.services.alpha_vantage_service import AlphaVantageService
 from app.services.polygon_service import PolygonService
+from app.services.cache_service import CacheManager, get_cache_service
 
 logger = logging.getLogger(__name__)
 
+# Quotes are shared through Redis so screener loops and repeat callers skip
+# the asset + latest-price round trips (and any provider call)
+PRICE_CACHE_TTL = 30
+
+# Chart payloads for a (symbol, days, interval) are shared for a couple of
+# minutes, so popular charts cost one history read per window
+CHART_CACHE_TTL = 120
+
+# Dialect-specific INSERT constructs that support ON CONFLICT upserts
+UPSERT_INSERTS = {
+    'postgresql': pg_insert,
+    'sqlite': sqlite_insert,
+}
+
+_rng = np.random.default_rng()
+
 class MarketDataService:
     def __init__(self, db: Session):
         self.db = db
         self.alpha_vantage_service = AlphaVantageService()
         self.polygon_service = PolygonService()
+        self.cache = CacheManager(get_cache_service())
+        self._pending_prices: List[Dict[str, Any]] = []
+        # Assets already resolved by symbol on this service's session
+        self._asset_cache: Dict[str, models.Asset] = {}
+
+    def _get_asset(self, symbol: str) -> Optional[models.Asset]:
+        """Look up an asset by symbol, querying at most once per symbol"""
+        asset = self._asset_cache.get(symbol)
+        if asset is None:
+            asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
+            if asset is not None:
+                self._asset_cache[symbol] = asset
+        return asset
 
     def search_assets(self, query: str, asset_type: Optional[str] = None, limit: int = 20) -> List[Dict]:
         """Search for assets by symbol or name"""
@@ -79,8 +113,19 @@ class MarketDataService:
 
     def get_current_price(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get current price for an asset"""
+        cached = self.cache.get_cached_market_data(symbol)
+        if cached is not None:
+            return cached
+        
+        price = self._lookup_current_price(symbol)
+        if price:
+            self.cache.cache_market_data(symbol, price, ttl=PRICE_CACHE_TTL)
+        return price
+
+    def _lookup_current_price(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Resolve a current price from the database, falling back to the API"""
         # First try to get from database
-        asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
+        asset = self._get_asset(symbol)
         if not asset:
             # If asset doesn't exist, try to fetch from API and create it
             return self._fetch_current_price_from_api(symbol)
@@ -101,14 +146,78 @@ class MarketDataService:
         # If no price in database, fetch from Alpha Vantage API
         return self._fetch_current_price_from_api(symbol)
 
+    def get_current_prices(self, symbols: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get current prices for several assets with batched lookups"""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        
+        cached = self.cache.get_cached_market_data_many(symbols)
+        symbols = [symbol for symbol in symbols if symbol not in cached]
+        if not symbols:
+            return cached
+        
+        # Latest stored price for every uncached symbol in one query
+        latest = self.db.query(
+            models.Price.asset_id,
+            func.max(models.Price.timestamp).label('timestamp')
+        ).join(models.Asset).filter(
+            models.Asset.symbol.in_(symbols)
+        ).group_by(models.Price.asset_id).subquery()
+        
+        rows = self.db.query(
+            models.Asset.symbol, models.Price.close_price, models.Price.timestamp
+        ).join(
+            models.Price, models.Price.asset_id == models.Asset.id
+        ).join(
+            latest, and_(
+                latest.c.asset_id == models.Price.asset_id,
+                latest.c.timestamp == models.Price.timestamp
+            )
+        ).all()
+        
+        prices = {
+            symbol: {
+                'symbol': symbol,
+                'price': close_price,
+                'timestamp': timestamp.isoformat(),
+                'source': 'database'
+            }
+            for symbol, close_price, timestamp in rows
+        }
+        
+        # One provider request per batch for everything the database lacks
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing and self.polygon_service.api_key:
+            for symbol, quote in self.polygon_service.get_snapshots(missing).items():
+                prices[symbol] = {**quote, 'source': 'polygon'}
+        
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing and self.alpha_vantage_service.api_key:
+            for symbol, quote in self.alpha_vantage_service.get_bulk_prices(missing).items():
+                prices[symbol] = {**quote, 'source': 'alpha_vantage'}
+        
+        # Anything still missing goes through the single-symbol path, with the
+        # fetched bars written together afterwards
+        for symbol in symbols:
+            if symbol not in prices:
+                prices[symbol] = self._fetch_current_price_from_api(symbol, flush=False)
+        self.flush_prices()
+        
+        found = {symbol: price for symbol, price in prices.items() if price}
+        if found:
+            self.cache.cache_market_data_many(found, ttl=PRICE_CACHE_TTL)
+        
+        return {**cached, **prices}
+
     def get_price_history(self, symbol: str, days: int = 30, interval: str = "1d") -> List[Dict]:
         """Get historical price data for an asset"""
-        asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
+        asset = self._get_asset(symbol)
         if not asset:
             # If asset doesn't exist, try to fetch from API
             current_price = self._fetch_current_price_from_api(symbol)
             if current_price:
-                asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
+                asset = self._get_asset(symbol)
             else:
                 return []
         
@@ -143,6 +252,16 @@ class MarketDataService:
 
     def get_chart_data(self, symbol: str, days: int = 30, interval: str = "1d") -> Dict:
         """Get formatted chart data for frontend"""
+        cached = self.cache.get_cached_chart_data(symbol, days, interval)
+        if cached is not None:
+            return cached
+        
+        chart_data = self._build_chart_data(symbol, days, interval)
+        self.cache.cache_chart_data(symbol, days, interval, chart_data, ttl=CHART_CACHE_TTL)
+        return chart_data
+
+    def _build_chart_data(self, symbol: str, days: int, interval: str) -> Dict:
+        """Assemble the chart payload from price history (or mock data)"""
         price_history = self.get_price_history(symbol, days, interval)
         
         if not price_history:
@@ -162,41 +281,87 @@ class MarketDataService:
             "change_percent": change_percent
         }
 
+    def get_chart_summary(self, symbol: str, days: int = 30) -> Optional[Dict]:
+        """Summarise a symbol's bars over the window in one aggregate query"""
+        asset = self._get_asset(symbol)
+        if not asset:
+            return None
+        
+        start_date = datetime.utcnow() - timedelta(days=days)
+        in_window = and_(
+            models.Price.asset_id == asset.id,
+            models.Price.timestamp >= start_date
+        )
+        first_bar = select(models.Price.open_price, models.Price.close_price).where(in_window).order_by(
+            models.Price.timestamp.asc()
+        ).limit(1).subquery()
+        last_close = select(models.Price.close_price).where(in_window).order_by(
+            models.Price.timestamp.desc()
+        ).limit(1).scalar_subquery()
+        
+        bars, low, high, total_volume, open_price, first_close, close_price = self.db.query(
+            func.count(),
+            func.min(models.Price.low_price),
+            func.max(models.Price.high_price),
+            func.sum(models.Price.volume),
+            select(first_bar.c.open_price).scalar_subquery(),
+            select(first_bar.c.close_price).scalar_subquery(),
+            last_close
+        ).filter(in_window).one()
+        
+        if not bars:
+            return None
+        
+        # Same first-close to last-close change as get_chart_data
+        change = close_price - first_close
+        return {
+            "symbol": symbol,
+            "current_price": close_price,
+            "change": change,
+            "change_percent": (change / first_close) * 100 if first_close else 0,
+            "volume": total_volume // bars,
+            "high": high,
+            "low": low,
+            "open": open_price,
+            "bars": bars
+        }
+
     def _generate_mock_chart_data(self, symbol: str, days: int) -> Dict:
         """Generate mock chart data for demonstration"""
-        import random
-        from datetime import datetime, timedelta
-        
         # Get current price from current_price method
         current_price_data = self.get_current_price(symbol)
         base_price = current_price_data.get('price', 100.0) if current_price_data else 100.0
         
-        # Generate mock historical data
-        data = []
-        for i in range(days):
-            date = datetime.now() - timedelta(days=days-i-1)
-            
-            # Add some realistic price movement
-            price_change = random.uniform(-0.05, 0.05)  # ±5% daily change
-            price = base_price * (1 + price_change * (i / days))
-            
-            # Generate OHLC data
-            high = price * random.uniform(1.0, 1.03)
-            low = price * random.uniform(0.97, 1.0)
-            open_price = price * random.uniform(0.98, 1.02)
-            close_price = price
-            
-            # Generate volume
-            volume = random.randint(1000000, 10000000)
-            
-            data.append({
+        # Draw every day's movement in one call per series
+        price_change = _rng.uniform(-0.05, 0.05, days)  # ±5% daily change
+        price = base_price * (1 + price_change * (np.arange(days) / days))
+        
+        # Generate OHLC data
+        high = np.round(price * _rng.uniform(1.0, 1.03, days), 2)
+        low = np.round(price * _rng.uniform(0.97, 1.0, days), 2)
+        open_price = np.round(price * _rng.uniform(0.98, 1.02, days), 2)
+        close_price = np.round(price, 2)
+        
+        # Generate volume
+        volume = _rng.integers(1000000, 10000000, days, endpoint=True)
+        
+        now = datetime.now()
+        dates = [now - timedelta(days=days - i - 1) for i in range(days)]
+        
+        data = [
+            {
                 "timestamp": date.isoformat(),
-                "open": round(open_price, 2),
-                "high": round(high, 2),
-                "low": round(low, 2),
-                "close": round(close_price, 2),
-                "volume": volume
-            })
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v
+            }
+            for date, o, h, l, c, v in zip(
+                dates, open_price.tolist(), high.tolist(), low.tolist(),
+                close_price.tolist(), volume.tolist()
+            )
+        ]
         
         # Calculate change from first to last day
         if len(data) > 1:
@@ -212,9 +377,9 @@ class MarketDataService:
             "current_price": data[-1]["close"] if data else base_price,
             "change": round(change, 2),
             "change_percent": round(change_percent, 2),
-            "volume": sum(d["volume"] for d in data) // len(data) if data else 0,
-            "high": max(d["high"] for d in data) if data else base_price,
-            "low": min(d["low"] for d in data) if data else base_price,
+            "volume": int(volume.sum()) // days if data else 0,
+            "high": float(high.max()) if data else base_price,
+            "low": float(low.min()) if data else base_price,
             "open": data[0]["open"] if data else base_price,
             "market_cap": base_price * 1000000000  # Mock market cap
         }
@@ -222,18 +387,22 @@ class MarketDataService:
     def get_trending_assets(self, limit: int = 10) -> List[Dict]:
         """Get trending/most active assets"""
         # Simple implementation - get assets with recent price updates
-        recent_assets = self.db.query(models.Asset).join(models.Price).filter(
+        recent_assets = self.db.query(
+            models.Asset.symbol, models.Asset.name, models.Asset.asset_type
+        ).join(models.Price).filter(
             models.Price.timestamp >= datetime.utcnow() - timedelta(hours=24)
         ).distinct().limit(limit).all()
         
+        current_prices = self.get_current_prices([symbol for symbol, _, _ in recent_assets])
+        
         return [
             {
-                "symbol": asset.symbol,
-                "name": asset.name,
-                "asset_type": asset.asset_type,
-                "current_price": self.get_current_price(asset.symbol)
+                "symbol": symbol,
+                "name": name,
+                "asset_type": asset_type,
+                "current_price": current_prices.get(symbol)
             }
-            for asset in recent_assets
+            for symbol, name, asset_type in recent_assets
         ]
 
     def get_asset_news(self, symbol: str, limit: int = 10) -> List[Dict]:
@@ -249,15 +418,15 @@ class MarketDataService:
             }
         ]
 
-    def _fetch_current_price_from_api(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """Fetch current price from Alpha Vantage API"""
+    def _fetch_current_price_from_api(self, symbol: str, flush: bool = True) -> Optional[Dict[str, Any]]:
+        """Fetch current price from Alpha Vantage API; pass flush=False to batch the write"""
         try:
             # Use Alpha Vantage service
             quote_data = self.alpha_vantage_service.get_current_price(symbol)
             
             if quote_data:
                 # Create asset if it doesn't exist
-                asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
+                asset = self._get_asset(symbol)
                 if not asset:
                     asset = models.Asset(
                         symbol=symbol,
@@ -268,11 +437,13 @@ class MarketDataService:
                         is_active=True
                     )
                     self.db.add(asset)
-                    self.db.commit()
-                    self.db.refresh(asset)
+                    self.db.flush()
+                    self._asset_cache[symbol] = asset
                 
                 # Store price data
-                self._store_price_data(symbol, quote_data['price'])
+                self._store_price_data(asset.id, quote_data['price'])
+                if flush:
+                    self.flush_prices()
                 
                 return {
                     'symbol': symbol,
@@ -314,20 +485,25 @@ class MarketDataService:
             
             if historical_data:
                 # Store the data in database
-                asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
+                asset = self._get_asset(symbol)
                 if asset:
-                    for data_point in historical_data:
-                        price_record = models.Price(
-                            asset_id=asset.id,
-                            timestamp=datetime.fromisoformat(data_point['date'].replace('Z', '+00:00')),
-                            open_price=data_point['open'],
-                            high_price=data_point['high'],
-                            low_price=data_point['low'],
-                            close_price=data_point['close'],
-                            volume=data_point['volume']
-                        )
-                        self.db.add(price_record)
-                    self.db.commit()
+                    # Parse every bar date in one vectorised call
+                    timestamps = pd.to_datetime(
+                        [data_point['date'] for data_point in historical_data],
+                        utc=True, format='ISO8601'
+                    ).to_pydatetime()
+                    self.store_prices([
+                        {
+                            'asset_id': asset.id,
+                            'timestamp': timestamp,
+                            'open_price': data_point['open'],
+                            'high_price': data_point['high'],
+                            'low_price': data_point['low'],
+                            'close_price': data_point['close'],
+                            'volume': data_point['volume']
+                        }
+                        for timestamp, data_point in zip(timestamps, historical_data)
+                    ])
                 
                 return historical_data
             
@@ -336,21 +512,96 @@ class MarketDataService:
             logger.error(f"Error fetching historical data for {symbol}: {e}")
             return []
 
-    def _store_price_data(self, symbol: str, price: float):
-        """Store price data in database"""
+    def _store_price_data(self, asset_id: int, price: float):
+        """Queue a quote bar for the next flush_prices() call"""
+        self._pending_prices.append({
+            'asset_id': asset_id,
+            'timestamp': datetime.utcnow(),
+            'open_price': price,
+            'high_price': price,
+            'low_price': price,
+            'close_price': price,
+            'volume': 0
+        })
+
+    def flush_prices(self):
+        """Write every queued quote bar in a single transaction"""
+        pending, self._pending_prices = self._pending_prices, []
+        self.store_prices(pending)
+
+    def store_prices(self, mappings: List[Dict[str, Any]]):
+        """Bulk-insert price bars and refresh their latest_prices rows, then commit once"""
+        if not mappings:
+            return
         try:
-            asset = self.db.query(models.Asset).filter(models.Asset.symbol == symbol).first()
-            if asset:
-                price_record = models.Price(
-                    asset_id=asset.id,
-                    timestamp=datetime.utcnow(),
-                    open_price=price,
-                    high_price=price,
-                    low_price=price,
-                    close_price=price,
-                    volume=0
-                )
-                self.db.add(price_record)
-                self.db.commit()
+            # One executemany instead of a unit-of-work INSERT per bar
+            self.db.execute(insert(models.Price), mappings)
+            for asset_id in {mapping['asset_id'] for mapping in mappings}:
+                self._refresh_latest_price(asset_id)
+            self.db.commit()
         except Exception as e:
-            logger.error(f"Error storing price data for {symbol}: {e}")
+            self.db.rollback()
+            # Assets created in the rolled-back transaction no longer exist
+            self._asset_cache.clear()
+            logger.error(f"Error storing {len(mappings)} price bars: {e}")
+
+    def _refresh_latest_price(self, asset_id: int):
+        """Upsert the asset's latest_prices row from its two newest bars"""
+        bars = self.db.query(
+            models.Price.timestamp,
+            models.Price.close_price,
+            models.Price.volume
+        ).filter(
+            models.Price.asset_id == asset_id
+        ).order_by(models.Price.timestamp.desc()).limit(2).all()
+        
+        if not bars:
+            return
+        
+        values = {
+            'timestamp': bars[0].timestamp,
+            'close_price': bars[0].close_price,
+            'previous_close': bars[1].close_price if len(bars) > 1 else None,
+            'volume': bars[0].volume
+        }
+        upsert = UPSERT_INSERTS[self.db.get_bind().dialect.name]
+        self.db.execute(
+            upsert(models.LatestPrice).values(asset_id=asset_id, **values).on_conflict_do_update(
+                index_elements=[models.LatestPrice.asset_id],
+                set_=values
+            )
+        )
+
+    def rebuild_latest_prices(self) -> int:
+        """Recompute the whole latest_prices rollup from the prices table"""
+        ranked = select(
+            models.Price.asset_id,
+            models.Price.timestamp,
+            models.Price.close_price,
+            models.Price.volume,
+            func.lag(models.Price.close_price).over(
+                partition_by=models.Price.asset_id,
+                order_by=models.Price.timestamp
+            ).label('previous_close'),
+            func.row_number().over(
+                partition_by=models.Price.asset_id,
+                order_by=models.Price.timestamp.desc()
+            ).label('rn')
+        ).subquery()
+        
+        columns = ['asset_id', 'timestamp', 'close_price', 'volume', 'previous_close']
+        self.db.execute(delete(models.LatestPrice))
+        result = self.db.execute(
+            insert(models.LatestPrice).from_select(
+                columns,
+                select(*(ranked.c[name] for name in columns)).where(ranked.c.rn == 1)
+            )
+        )
+        self.db.commit()
+        return result.rowcount
+    
+    def backfill_latest_prices(self) -> int:
+        """Build the latest_prices rollup once if it has never been populated"""
+        if self.db.query(models.LatestPrice.asset_id).first() is not None:
+            return 0
+        return self.rebuild_latest_prices()
@@ -1,7 +1,7 @@
 import logging
 from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import and_, or_, func, case
 from app.db import models
 from app.services.market_data_service import MarketDataService
 
@@ -39,14 +39,24 @@ class MarketScreenerService:
             if filters.get('sector'):
                 query = query.filter(models.Asset.sector == filters['sector'])
             
-            # Get results
-            assets = query.limit(filters.get('limit', 50)).all()
+            # Get results; only the columns the response uses. DISTINCT keeps
+            # the one-row-per-asset result the entity query used to unique.
+            assets = query.with_entities(
+                models.Asset.symbol,
+                models.Asset.name,
+                models.Asset.exchange,
+                models.Asset.sector
+            ).distinct().limit(filters.get('limit', 50)).all()
+            
+            # Enhance with current data, fetched for every asset in one batch
+            current_prices = self.market_data_service.get_current_prices(
+                [asset.symbol for asset in assets]
+            )
             
-            # Enhance with current data
             results = []
             for asset in assets:
                 try:
-                    current_price = self.market_data_service.get_current_price(asset.symbol)
+                    current_price = current_prices.get(asset.symbol)
                     if current_price:
                         results.append({
                             'symbol': asset.symbol,
@@ -69,44 +79,57 @@ class MarketScreenerService:
             logger.error(f"Error screening stocks: {e}")
             return []
 
+    def _latest_price_changes(self):
+        """Subquery of every stock's latest bar alongside the close before it"""
+        # Read from the latest_prices rollup rather than ranking all of prices
+        return self.db.query(
+            models.LatestPrice.asset_id,
+            models.LatestPrice.close_price,
+            models.LatestPrice.volume,
+            models.LatestPrice.previous_close
+        ).join(models.Asset).filter(
+            models.Asset.asset_type == 'stock'
+        ).subquery()
+
+    def _get_movers(self, limit: int, gainers: bool) -> List[Dict]:
+        """Rank stocks by their latest bar-over-bar change in one query"""
+        latest = self._latest_price_changes()
+        change = latest.c.close_price - latest.c.previous_close
+        change_ratio = change / latest.c.previous_close
+        
+        rows = self.db.query(
+            models.Asset.symbol,
+            models.Asset.name,
+            latest.c.close_price,
+            change.label('change'),
+            (change_ratio * 100).label('change_percent'),
+            latest.c.volume
+        ).join(
+            models.Asset, models.Asset.id == latest.c.asset_id
+        ).filter(
+            latest.c.previous_close.isnot(None),
+            latest.c.previous_close != 0,
+            change > 0 if gainers else change < 0
+        ).order_by(
+            change_ratio.desc() if gainers else change_ratio.asc()
+        ).limit(limit).all()
+        
+        return [
+            {
+                'symbol': symbol,
+                'name': name,
+                'current_price': float(close_price),
+                'change': float(change_value),
+                'change_percent': float(change_percent),
+                'volume': int(volume) if volume else 0
+            }
+            for symbol, name, close_price, change_value, change_percent, volume in rows
+        ]
+
     def get_top_gainers(self, limit: int = 20) -> List[Dict]:
         """Get top gaining stocks"""
         try:
-            # Get recent price data
-            recent_prices = self.db.query(models.Price).join(models.Asset).filter(
-                models.Asset.asset_type == 'stock'
-            ).order_by(models.Price.timestamp.desc()).limit(1000).all()
-            
-            # Calculate gains
-            gainers = []
-            for price in recent_prices:
-                try:
-                    # Get previous price for comparison
-                    previous_price = self.db.query(models.Price).filter(
-                        models.Price.asset_id == price.asset_id,
-                        models.Price.timestamp < price.timestamp
-                    ).order_by(models.Price.timestamp.desc()).first()
-                    
-                    if previous_price:
-                        change = price.close_price - previous_price.close_price
-                        change_percent = (change / previous_price.close_price) * 100
-                        
-                        if change_percent > 0:  # Only gainers
-                            gainers.append({
-                                'symbol': price.asset.symbol,
-                                'name': price.asset.name,
-                                'current_price': float(price.close_price),
-                                'change': float(change),
-                                'change_percent': float(change_percent),
-                                'volume': int(price.volume) if price.volume else 0
-                            })
-                except Exception as e:
-                    logger.error(f"Error calculating gain for {price.asset.symbol}: {e}")
-                    continue
-            
-            # Sort by change percentage and return top gainers
-            gainers.sort(key=lambda x: x['change_percent'], reverse=True)
-            return gainers[:limit]
+            return self._get_movers(limit, gainers=True)
             
         except Exception as e:
             logger.error(f"Error getting top gainers: {e}")
@@ -115,41 +138,7 @@ class MarketScreenerService:
     def get_top_losers(self, limit: int = 20) -> List[Dict]:
         """Get top losing stocks"""
         try:
-            # Get recent price data
-            recent_prices = self.db.query(models.Price).join(models.Asset).filter(
-                models.Asset.asset_type == 'stock'
-            ).order_by(models.Price.timestamp.desc()).limit(1000).all()
-            
-            # Calculate losses
-            losers = []
-            for price in recent_prices:
-                try:
-                    # Get previous price for comparison
-                    previous_price = self.db.query(models.Price).filter(
-                        models.Price.asset_id == price.asset_id,
-                        models.Price.timestamp < price.timestamp
-                    ).order_by(models.Price.timestamp.desc()).first()
-                    
-                    if previous_price:
-                        change = price.close_price - previous_price.close_price
-                        change_percent = (change / previous_price.close_price) * 100
-                        
-                        if change_percent < 0:  # Only losers
-                            losers.append({
-                                'symbol': price.asset.symbol,
-                                'name': price.asset.name,
-                                'current_price': float(price.close_price),
-                                'change': float(change),
-                                'change_percent': float(change_percent),
-                                'volume': int(price.volume) if price.volume else 0
-                            })
-                except Exception as e:
-                    logger.error(f"Error calculating loss for {price.asset.symbol}: {e}")
-                    continue
-            
-            # Sort by change percentage (most negative first) and return top losers
-            losers.sort(key=lambda x: x['change_percent'])
-            return losers[:limit]
+            return self._get_movers(limit, gainers=False)
             
         except Exception as e:
             logger.error(f"Error getting top losers: {e}")
@@ -159,7 +148,10 @@ class MarketScreenerService:
         """Get most actively traded stocks"""
         try:
             # Get recent price data ordered by volume
-            recent_prices = self.db.query(models.Price).join(models.Asset).filter(
+            # The Asset join doubles as the eager load for price.asset
+            recent_prices = self.db.query(models.Price).join(models.Asset).options(
+                contains_eager(models.Price.asset)
+            ).filter(
                 models.Asset.asset_type == 'stock',
                 models.Price.volume.isnot(None)
             ).order_by(models.Price.timestamp.desc(), models.Price.volume.desc()).limit(limit).all()
@@ -188,44 +180,39 @@ class MarketScreenerService:
     def get_sector_performance(self) -> List[Dict]:
         """Get performance by sector"""
         try:
-            # Get all stocks with their sectors
-            stocks = self.db.query(models.Asset).filter(
-                models.Asset.asset_type == 'stock',
-                models.Asset.sector.isnot(None)
-            ).all()
-            
-            sector_data = {}
-            
-            for stock in stocks:
-                try:
-                    current_price = self.market_data_service.get_current_price(stock.symbol)
-                    if current_price and stock.sector:
-                        if stock.sector not in sector_data:
-                            sector_data[stock.sector] = {
-                                'sector': stock.sector,
-                                'stocks': 0,
-                                'total_change': 0,
-                                'avg_change': 0
-                            }
-                        
-                        sector_data[stock.sector]['stocks'] += 1
-                        sector_data[stock.sector]['total_change'] += current_price.get('change_percent', 0)
-                except Exception as e:
-                    logger.error(f"Error processing sector data for {stock.symbol}: {e}")
-                    continue
-            
-            # Calculate average change per sector
-            for sector in sector_data:
-                if sector_data[sector]['stocks'] > 0:
-                    sector_data[sector]['avg_change'] = (
-                        sector_data[sector]['total_change'] / sector_data[sector]['stocks']
-                    )
+            # Latest bar-over-bar change per stock, averaged per sector in SQL
+            latest = self._latest_price_changes()
+            change_percent = case(
+                (latest.c.previous_close != 0,
+                 (latest.c.close_price - latest.c.previous_close) / latest.c.previous_close * 100),
+                else_=None
+            )
+            # Stocks without a previous close count as unchanged
+            total_change = func.coalesce(func.sum(change_percent), 0.0)
+            avg_change = total_change / func.count()
             
-            # Convert to list and sort by average change
-            sector_performance = list(sector_data.values())
-            sector_performance.sort(key=lambda x: x['avg_change'], reverse=True)
+            rows = self.db.query(
+                models.Asset.sector,
+                func.count().label('stocks'),
+                total_change.label('total_change'),
+                avg_change.label('avg_change')
+            ).join(
+                latest, latest.c.asset_id == models.Asset.id
+            ).filter(
+                models.Asset.sector.isnot(None)
+            ).group_by(
+                models.Asset.sector
+            ).order_by(avg_change.desc()).all()
             
-            return sector_performance
+            return [
+                {
+                    'sector': sector,
+                    'stocks': stocks,
+                    'total_change': float(total_change),
+                    'avg_change': float(avg)
+                }
+                for sector, stocks, total_change, avg in rows
+            ]
             
         except Exception as e:
             logger.error(f"Error getting sector performance: {e}")
@@ -239,41 +226,28 @@ class MarketScreenerService:
                 models.Asset.asset_type == 'stock'
             ).count()
             
-            # Get recent price data
-            recent_prices = self.db.query(models.Price).join(models.Asset).filter(
-                models.Asset.asset_type == 'stock'
-            ).order_by(models.Price.timestamp.desc()).limit(1000).all()
+            # Bucket every stock's latest bar by direction of change and sum
+            # the volume in the same pass
+            latest = self._latest_price_changes()
+            change = latest.c.close_price - latest.c.previous_close
+            direction = case(
+                (latest.c.previous_close.is_(None), None),
+                (change > 0, 1),
+                (change < 0, -1),
+                else_=0
+            ).label('direction')
             
-            # Calculate market statistics
-            total_volume = 0
-            advancing_stocks = 0
-            declining_stocks = 0
-            unchanged_stocks = 0
+            rows = self.db.query(
+                direction,
+                func.count(),
+                func.coalesce(func.sum(latest.c.volume), 0)
+            ).group_by(direction).all()
             
-            for price in recent_prices:
-                try:
-                    if price.volume:
-                        total_volume += int(price.volume)
-                    
-                    # Get previous price for comparison
-                    previous_price = self.db.query(models.Price).filter(
-                        models.Price.asset_id == price.asset_id,
-                        models.Price.timestamp < price.timestamp
-                    ).order_by(models.Price.timestamp.desc()).first()
-                    
-                    if previous_price:
-                        change_percent = ((price.close_price - previous_price.close_price) / previous_price.close_price) * 100
-                        
-                        if change_percent > 0:
-                            advancing_stocks += 1
-                        elif change_percent < 0:
-                            declining_stocks += 1
-                        else:
-                            unchanged_stocks += 1
-                            
-                except Exception as e:
-                    logger.error(f"Error processing market overview for {price.asset.symbol}: {e}")
-                    continue
+            counts = {bucket: count for bucket, count, _ in rows}
+            total_volume = int(sum(volume for _, _, volume in rows))
+            advancing_stocks = counts.get(1, 0)
+            declining_stocks = counts.get(-1, 0)
+            unchanged_stocks = counts.get(0, 0)
             
             return {
                 'total_stocks': total_stocks,
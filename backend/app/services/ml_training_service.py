@@ -1,12 +1,17 @@
 import logging
+import numba
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, List, Optional, Tuple, Any
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from functools import lru_cache
+from collections import OrderedDict
 import joblib
 import os
 import json
+import threading
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import LinearRegression, Ridge, Lasso
 from sklearn.svm import SVR
@@ -28,6 +33,77 @@ from app.services.technical_analysis_service import TechnicalAnalysisService
 
 logger = logging.getLogger(__name__)
 
+# Below this many training rows the host-to-GPU copy costs more than the
+# faster tree construction saves, so small fits stay on the CPU
+GPU_MIN_TRAIN_ROWS = 50_000
+
+# Lookback for the portfolio model's volatility and momentum features
+PORTFOLIO_FEATURE_WINDOW = 20
+
+# Process-wide LRU of loaded (scaler, model) pairs keyed by model id, stamped
+# with the files' mtimes so a retrain that rewrites them forces a reload
+MODEL_CACHE_SIZE = 32
+_model_cache: "OrderedDict[int, Tuple[Tuple[float, float], Any, Any]]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+# LSTM settings that keep Keras on the fused cuDNN kernel; changing any of
+# them silently falls back to the much slower generic RNN loop on GPU
+CUDNN_LSTM_KWARGS = {
+    "activation": "tanh",
+    "recurrent_activation": "sigmoid",
+    "recurrent_dropout": 0.0,
+    "unroll": False,
+    "use_bias": True,
+}
+
+@numba.njit(cache=True)
+def _prediction_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Tuple[float, float, float, float]:
+    """MSE, MAE, R² and direction accuracy of a forecast in one pass over the errors."""
+    n = y_true.shape[0]
+    mean = y_true.mean()
+    sse = 0.0
+    sae = 0.0
+    sst = 0.0
+    hits = 0
+    for i in range(n):
+        err = y_true[i] - y_pred[i]
+        sse += err * err
+        sae += abs(err)
+        dev = y_true[i] - mean
+        sst += dev * dev
+        # Same move direction bar over bar (flat counts as a direction)
+        if i > 0 and np.sign(y_pred[i] - y_pred[i - 1]) == np.sign(y_true[i] - y_true[i - 1]):
+            hits += 1
+    
+    if sst != 0.0:
+        r2 = 1.0 - sse / sst
+    else:
+        # sklearn's r2_score convention for a constant target
+        r2 = 1.0 if sse == 0.0 else 0.0
+    direction_accuracy = hits / (n - 1) if n > 1 else np.nan
+    return sse / n, sae / n, r2, direction_accuracy
+
+@lru_cache(maxsize=1)
+def _xgb_device() -> str:
+    """'cuda' if XGBoost can build trees on a GPU here, else 'cpu'."""
+    try:
+        probe = xgb.XGBRegressor(device="cuda", n_estimators=1)
+        probe.fit(np.zeros((2, 2)), np.zeros(2))
+        # XGBoost quietly falls back to the CPU when no GPU is visible
+        config = json.loads(probe.get_booster().save_config())
+        return "cuda" if config["learner"]["generic_param"]["device"].startswith("cuda") else "cpu"
+    except Exception:
+        return "cpu"
+
+@lru_cache(maxsize=1)
+def _lgbm_device() -> str:
+    """'gpu' if LightGBM was built with GPU support and finds a device, else 'cpu'."""
+    try:
+        lgb.LGBMRegressor(device="gpu", n_estimators=1, verbose=-1).fit(np.zeros((2, 2)), np.zeros(2))
+        return "gpu"
+    except Exception:
+        return "cpu"
+
 class MLTrainingService:
     def __init__(self, db: Session):
         self.db = db
@@ -73,10 +149,11 @@ class MLTrainingService:
             X = combined_data[feature_columns].values
             y = combined_data['close'].shift(-target_days).dropna().values
             
-            # Align X and y
+            # Align X and y, as contiguous float32 so the scaler and the tree
+            # builders move half the bytes
             min_length = min(len(X), len(y))
-            X = X[:min_length]
-            y = y[:min_length]
+            X = np.ascontiguousarray(X[:min_length], dtype=np.float32)
+            y = np.ascontiguousarray(y[:min_length], dtype=np.float32)
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -89,14 +166,17 @@ class MLTrainingService:
             X_test_scaled = scaler.transform(X_test)
             
             # Train model
-            model = self._create_model(model_type)
+            model = self._create_model(model_type, len(X_train))
             
             if model_type == "lstm":
                 # Reshape for LSTM
                 X_train_scaled = X_train_scaled.reshape((X_train_scaled.shape[0], 1, X_train_scaled.shape[1]))
                 X_test_scaled = X_test_scaled.reshape((X_test_scaled.shape[0], 1, X_test_scaled.shape[1]))
                 
-                model.fit(X_train_scaled, y_train, epochs=100, batch_size=32, verbose=0)
+                # Large sets fill the GPU with bigger batches; small ones keep
+                # enough updates per epoch to converge
+                batch_size = 256 if len(X_train_scaled) >= GPU_MIN_TRAIN_ROWS else 32
+                model.fit(X_train_scaled, y_train, epochs=100, batch_size=batch_size, verbose=0)
             else:
                 model.fit(X_train_scaled, y_train)
             
@@ -106,15 +186,14 @@ class MLTrainingService:
             else:
                 y_pred = model.predict(X_test_scaled)
             
-            # Calculate metrics
-            mse = mean_squared_error(y_test, y_pred)
-            mae = mean_absolute_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
+            # Calculate metrics, including the share of correctly predicted
+            # directions, in one fused pass
+            mse, mae, r2, direction_accuracy = _prediction_metrics(
+                np.ascontiguousarray(y_test, dtype=np.float64),
+                np.ascontiguousarray(y_pred, dtype=np.float64)
+            )
             rmse = np.sqrt(mse)
             
-            # Calculate accuracy (percentage of correct direction predictions)
-            direction_accuracy = np.mean(np.sign(y_pred[1:] - y_pred[:-1]) == np.sign(y_test[1:] - y_test[:-1]))
-            
             # Save model and scaler
             model_filename = f"{user_id}_{symbol}_{model_type}_{target_days}d.joblib"
             scaler_filename = f"{user_id}_{symbol}_{model_type}_{target_days}d_scaler.joblib"
@@ -184,17 +263,17 @@ class MLTrainingService:
             # This would integrate with the news service
             # For now, we'll create a mock implementation
             
-            # Mock sentiment data
-            np.random.seed(42)
+            # Mock sentiment data, drawn as float32 from a seeded generator
+            rng = np.random.default_rng(42)
             n_samples = 1000
             
             # Generate mock features
-            sentiment_scores = np.random.uniform(-1, 1, n_samples)
-            news_volume = np.random.poisson(10, n_samples)
-            price_changes = np.random.normal(0, 0.02, n_samples)
+            sentiment_scores = rng.random(n_samples, dtype=np.float32) * 2 - 1
+            news_volume = rng.poisson(10, n_samples).astype(np.float32)
+            price_changes = 0.02 * rng.standard_normal(n_samples, dtype=np.float32)
             
             # Create target (next day price change)
-            target = price_changes + 0.1 * sentiment_scores + 0.05 * np.random.normal(0, 1, n_samples)
+            target = price_changes + 0.1 * sentiment_scores + 0.05 * rng.standard_normal(n_samples, dtype=np.float32)
             
             # Prepare features
             X = np.column_stack([sentiment_scores, news_volume, price_changes])
@@ -211,7 +290,7 @@ class MLTrainingService:
             X_test_scaled = scaler.transform(X_test)
             
             # Train model
-            model = self._create_model(model_type)
+            model = self._create_model(model_type, len(X_train))
             model.fit(X_train_scaled, y_train)
             
             # Make predictions
@@ -294,26 +373,26 @@ class MLTrainingService:
             features = []
             targets = []
             
+            window = PORTFOLIO_FEATURE_WINDOW
             for symbol in symbols:
                 price_data = self.market_data_service.get_historical_data(symbol, start_date, end_date)
-                if price_data is not None and not price_data.empty:
-                    # Calculate features
-                    returns = price_data['close'].pct_change().dropna()
-                    volatility = returns.rolling(20).std()
-                    momentum = price_data['close'].pct_change(20)
+                if price_data is not None and len(price_data) > window + 1:
+                    # Calculate features on the raw close array; returns[k] is
+                    # the return into bar k + 1
+                    close = price_data['close'].to_numpy(dtype=np.float64)
+                    returns = close[1:] / close[:-1] - 1
+                    volatility = sliding_window_view(returns, window).std(axis=-1, ddof=1)
+                    momentum = close[window:] / close[:-window] - 1
                     
-                    # Combine features
-                    feature_data = pd.DataFrame({
-                        'returns': returns,
-                        'volatility': volatility,
-                        'momentum': momentum
-                    }).dropna()
+                    # One row per bar from `window` on, paired with the next
+                    # period's return as the target (so the last bar is dropped)
+                    feature_data = np.column_stack([returns[window - 1:-1], volatility[:-1], momentum[:-1]])
+                    target = returns[window:]
+                    valid = np.isfinite(feature_data).all(axis=1) & np.isfinite(target)
                     
-                    if len(feature_data) > 50:
-                        features.append(feature_data.values)
-                        # Target: next period return
-                        target = returns.shift(-1).dropna()
-                        targets.append(target.values[:len(feature_data)])
+                    if valid.sum() > 50:
+                        features.append(feature_data[valid])
+                        targets.append(target[valid])
             
             if not features:
                 return {"error": "Insufficient data for training"}
@@ -333,7 +412,7 @@ class MLTrainingService:
             X_test_scaled = scaler.transform(X_test)
             
             # Train model
-            model = self._create_model(model_type)
+            model = self._create_model(model_type, len(X_train))
             model.fit(X_train_scaled, y_train)
             
             # Make predictions
@@ -403,21 +482,10 @@ class MLTrainingService:
                 return {"error": "Model not found"}
             
             # Load model and scaler
-            model_path = os.path.join(self.models_dir, ml_model.model_filename)
-            scaler_path = os.path.join(self.scalers_dir, ml_model.scaler_filename)
-            
-            if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+            artifacts = self._load_model_artifacts(ml_model)
+            if artifacts is None:
                 return {"error": "Model files not found"}
-            
-            # Load scaler
-            scaler = joblib.load(scaler_path)
-            
-            # Load model
-            if ml_model.model_type.startswith("lstm"):
-                from tensorflow.keras.models import load_model
-                model = load_model(model_path.replace('.joblib', '.h5'))
-            else:
-                model = joblib.load(model_path)
+            scaler, model = artifacts
             
             # Prepare input data
             features = json.loads(ml_model.features)
@@ -451,6 +519,95 @@ class MLTrainingService:
             logger.error(f"Error getting model predictions: {e}")
             return {"error": str(e)}
     
+    def get_model_predictions_batch(self, user_id: str, model_id: int,
+                                    input_data_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Get predictions for many input rows with one transform and one predict call."""
+        try:
+            ml_model = self.db.query(models.MLModel).filter(
+                models.MLModel.id == model_id,
+                models.MLModel.user_id == user_id,
+                models.MLModel.is_active == True
+            ).first()
+            
+            if not ml_model:
+                return {"error": "Model not found"}
+            
+            if not input_data_list:
+                return {"error": "No input data provided"}
+            
+            features = json.loads(ml_model.features)
+            for row_number, input_data in enumerate(input_data_list):
+                for feature in features:
+                    if feature not in input_data:
+                        return {"error": f"Missing feature: {feature} (row {row_number})"}
+            
+            artifacts = self._load_model_artifacts(ml_model)
+            if artifacts is None:
+                return {"error": "Model files not found"}
+            scaler, model = artifacts
+            
+            # Build the whole input matrix straight from the rows
+            X = np.fromiter(
+                (input_data[feature] for input_data in input_data_list for feature in features),
+                dtype=np.float64,
+                count=len(input_data_list) * len(features)
+            ).reshape(len(input_data_list), len(features))
+            X_scaled = scaler.transform(X)
+            
+            if ml_model.model_type.startswith("lstm"):
+                X_scaled = X_scaled.reshape((X_scaled.shape[0], 1, X_scaled.shape[1]))
+                predictions = model.predict(X_scaled, verbose=0).ravel()
+            else:
+                predictions = model.predict(X_scaled)
+            
+            return {
+                "predictions": predictions.astype(float).tolist(),
+                "model_id": model_id,
+                "model_type": ml_model.model_type,
+                "features_used": features,
+                "prediction_date": datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting batch model predictions: {e}")
+            return {"error": str(e)}
+    
+    def _load_model_artifacts(self, ml_model: models.MLModel) -> Optional[Tuple[Any, Any]]:
+        """Load a trained model's scaler and estimator, or None if the files are gone."""
+        model_path = os.path.join(self.models_dir, ml_model.model_filename)
+        scaler_path = os.path.join(self.scalers_dir, ml_model.scaler_filename)
+        is_lstm = ml_model.model_type.startswith("lstm")
+        if is_lstm:
+            # Keras models are saved as .h5 instead of .joblib
+            model_path = model_path.replace('.joblib', '.h5')
+        
+        try:
+            mtimes = (os.stat(model_path).st_mtime, os.stat(scaler_path).st_mtime)
+        except FileNotFoundError:
+            return None
+        
+        with _model_cache_lock:
+            cached = _model_cache.get(ml_model.id)
+            if cached is not None and cached[0] == mtimes:
+                _model_cache.move_to_end(ml_model.id)
+                return cached[1], cached[2]
+        
+        scaler = joblib.load(scaler_path)
+        
+        if is_lstm:
+            from tensorflow.keras.models import load_model
+            model = load_model(model_path)
+        else:
+            model = joblib.load(model_path)
+        
+        with _model_cache_lock:
+            _model_cache[ml_model.id] = (mtimes, scaler, model)
+            _model_cache.move_to_end(ml_model.id)
+            while len(_model_cache) > MODEL_CACHE_SIZE:
+                _model_cache.popitem(last=False)
+        
+        return scaler, model
+    
     def get_user_models(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all models for a user."""
         try:
@@ -500,6 +657,9 @@ class MLTrainingService:
             if os.path.exists(scaler_path):
                 os.remove(scaler_path)
             
+            with _model_cache_lock:
+                _model_cache.pop(ml_model.id, None)
+            
             # Mark as inactive in database
             ml_model.is_active = False
             self.db.commit()
@@ -510,8 +670,10 @@ class MLTrainingService:
             logger.error(f"Error deleting model: {e}")
             return {"error": str(e)}
     
-    def _create_model(self, model_type: str):
-        """Create a model instance based on type."""
+    def _create_model(self, model_type: str, n_samples: int = 0):
+        """Create a model instance based on type, on the GPU for large boosted fits."""
+        use_gpu = n_samples >= GPU_MIN_TRAIN_ROWS
+        
         if model_type == "random_forest":
             return RandomForestRegressor(n_estimators=100, random_state=42)
         elif model_type == "gradient_boosting":
@@ -527,14 +689,19 @@ class MLTrainingService:
         elif model_type == "neural_network":
             return MLPRegressor(hidden_layer_sizes=(100, 50), random_state=42, max_iter=500)
         elif model_type == "xgboost":
+            if use_gpu and _xgb_device() == "cuda":
+                return xgb.XGBRegressor(n_estimators=100, random_state=42, device="cuda", tree_method="hist")
             return xgb.XGBRegressor(n_estimators=100, random_state=42)
         elif model_type == "lightgbm":
+            if use_gpu and _lgbm_device() == "gpu":
+                return lgb.LGBMRegressor(n_estimators=100, random_state=42, device="gpu", gpu_use_dp=False)
             return lgb.LGBMRegressor(n_estimators=100, random_state=42)
         elif model_type == "lstm":
+            # Dropout between the LSTMs is the second layer's input dropout,
+            # which the cuDNN kernel supports (recurrent dropout is not)
             model = Sequential([
-                LSTM(50, return_sequences=True, input_shape=(1, 8)),
-                Dropout(0.2),
-                LSTM(50, return_sequences=False),
+                LSTM(50, return_sequences=True, input_shape=(1, 8), **CUDNN_LSTM_KWARGS),
+                LSTM(50, return_sequences=False, dropout=0.2, **CUDNN_LSTM_KWARGS),
                 Dropout(0.2),
                 Dense(25),
                 Dense(1)
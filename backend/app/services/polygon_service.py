@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import logging
 from typing import Dict, List, Optional, Any
@@ -8,6 +9,14 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# One keep-alive connection pool per process so consecutive Polygon calls
+# (and every service instance) reuse the TLS connection
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=20))
+
+# Keep snapshot URLs short; one request still replaces up to this many quote calls
+SNAPSHOT_BATCH_SIZE = 20
+
 class PolygonService:
     """Polygon.io API service for additional market data"""
     
@@ -40,7 +49,7 @@ class PolygonService:
         url = f"{self.base_url}{endpoint}"
         
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = _session.get(url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -143,6 +152,41 @@ class PolygonService:
             logger.error(f"Error getting previous close for {symbol}: {e}")
             return None
     
+    def get_snapshots(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get latest quotes for several tickers, one request per batch"""
+        quotes = {}
+        for i in range(0, len(symbols), SNAPSHOT_BATCH_SIZE):
+            batch = symbols[i:i + SNAPSHOT_BATCH_SIZE]
+            try:
+                data = self._make_request(
+                    "/v2/snapshot/locale/us/markets/stocks/tickers",
+                    {'tickers': ','.join(batch)}
+                )
+                
+                for ticker in data.get('tickers', []):
+                    day = ticker.get('day') or {}
+                    last_trade = ticker.get('lastTrade') or {}
+                    price = last_trade.get('p') or day.get('c')
+                    if not price:
+                        continue
+                    quotes[ticker['ticker']] = {
+                        'symbol': ticker['ticker'],
+                        'price': price,
+                        'change': ticker.get('todaysChange', 0.0),
+                        'change_percent': ticker.get('todaysChangePerc', 0.0),
+                        'volume': day.get('v', 0),
+                        'high': day.get('h', price),
+                        'low': day.get('l', price),
+                        'open': day.get('o', price),
+                        'timestamp': datetime.fromtimestamp(ticker['updated'] / 1e9).isoformat()
+                        if ticker.get('updated') else datetime.utcnow().isoformat()
+                    }
+                    
+            except Exception as e:
+                logger.error(f"Error getting snapshots for {batch}: {e}")
+        
+        return quotes
+    
     def search_tickers(self, search: str, market: str = 'stocks', limit: int = 10) -> Optional[List[Dict[str, Any]]]:
         """Search for tickers"""
         try:
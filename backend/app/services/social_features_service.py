@@ -1,9 +1,8 @@
 import logging
-import json
 from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc, func, cast, Text
 
 from app.db import models
 
@@ -23,7 +22,7 @@ class SocialFeaturesService:
                 content=content,
                 post_type=post_type,
                 symbol=symbol,
-                tags=json.dumps(tags) if tags else None,
+                tags=tags or None,
                 likes_count=0,
                 comments_count=0,
                 shares_count=0,
@@ -105,7 +104,7 @@ class SocialFeaturesService:
                     "content": post.content,
                     "post_type": post.post_type,
                     "symbol": post.symbol,
-                    "tags": json.loads(post.tags) if post.tags else [],
+                    "tags": post.tags or [],
                     "likes_count": post.likes_count,
                     "comments_count": post.comments_count,
                     "shares_count": post.shares_count,
@@ -348,7 +347,7 @@ class SocialFeaturesService:
                     "content": post.content,
                     "post_type": post.post_type,
                     "symbol": post.symbol,
-                    "tags": json.loads(post.tags) if post.tags else [],
+                    "tags": post.tags or [],
                     "likes_count": post.likes_count,
                     "comments_count": post.comments_count,
                     "shares_count": post.shares_count,
@@ -425,7 +424,7 @@ class SocialFeaturesService:
                     models.SocialPost.is_public == True,
                     or_(
                         models.SocialPost.content.ilike(f"%{query}%"),
-                        models.SocialPost.tags.ilike(f"%{query}%")
+                        cast(models.SocialPost.tags, Text).ilike(f"%{query}%")
                     )
                 )
             ).order_by(desc(models.SocialPost.created_at)).offset(offset).limit(limit).all()
@@ -443,7 +442,7 @@ class SocialFeaturesService:
                     "content": post.content,
                     "post_type": post.post_type,
                     "symbol": post.symbol,
-                    "tags": json.loads(post.tags) if post.tags else [],
+                    "tags": post.tags or [],
                     "likes_count": post.likes_count,
                     "comments_count": post.comments_count,
                     "shares_count": post.shares_count,
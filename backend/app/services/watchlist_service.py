@@ -98,10 +98,12 @@ class WatchlistService:
                 models.Watchlist.user_id == user_id
             ).all()
             
+            quotes = self._get_quotes(watchlist_items)
+            
             results = []
             for item in watchlist_items:
                 try:
-                    current_price = self.market_data_service.get_current_price(item.symbol)
+                    current_price = quotes.get(item.symbol)
                     
                     # Check if alert should be triggered
                     alert_triggered = False
@@ -169,10 +171,12 @@ class WatchlistService:
                 models.Watchlist.alert_price.isnot(None)
             ).all()
             
+            quotes = self._get_quotes(watchlist_items)
+            
             alerts = []
             for item in watchlist_items:
                 try:
-                    current_price = self.market_data_service.get_current_price(item.symbol)
+                    current_price = quotes.get(item.symbol)
                     
                     if current_price and item.alert_price:
                         if current_price['price'] >= item.alert_price:
@@ -207,10 +211,11 @@ class WatchlistService:
             positive_changes = 0
             negative_changes = 0
             total_change_percent = 0
+            quotes = self._get_quotes(watchlist_items)
             
             for item in watchlist_items:
                 try:
-                    current_price = self.market_data_service.get_current_price(item.symbol)
+                    current_price = quotes.get(item.symbol)
                     if current_price:
                         change_percent = current_price.get('change_percent', 0)
                         total_change_percent += change_percent
@@ -236,3 +241,11 @@ class WatchlistService:
         except Exception as e:
             logger.error(f"Error getting watchlist performance: {e}")
             return {"error": f"Failed to get performance: {str(e)}"}
+
+    def _get_quotes(self, watchlist_items: List[models.Watchlist]) -> Dict[str, Optional[Dict]]:
+        """Fetch current prices for all watchlist items in one batched call"""
+        try:
+            return self.market_data_service.get_current_prices([item.symbol for item in watchlist_items])
+        except Exception as e:
+            logger.error(f"Error getting watchlist prices: {e}")
+            return {}
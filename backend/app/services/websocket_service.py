@@ -60,18 +60,25 @@ class WebSocketManager:
     async def send_personal_message(self, message: Dict[str, Any], user_id: str):
         """Send a message to a specific user."""
         if user_id in self.active_connections:
+            await self.send_text_to_user(user_id, json.dumps(message))
+    
+    async def send_text_to_user(self, user_id: str, payload: str):
+        """Send an already-serialized JSON payload to a specific user."""
+        connection = self.active_connections.get(user_id)
+        if connection is not None:
             try:
-                await self.active_connections[user_id].send_text(json.dumps(message))
+                await connection.send_text(payload)
             except Exception as e:
                 logger.error(f"Error sending message to user {user_id}: {e}")
                 self.disconnect(user_id)
     
     async def broadcast_to_all(self, message: Dict[str, Any]):
         """Broadcast a message to all connected users."""
+        payload = json.dumps(message)
         disconnected_users = []
         for user_id, connection in self.active_connections.items():
             try:
-                await connection.send_text(json.dumps(message))
+                await connection.send_text(payload)
             except Exception as e:
                 logger.error(f"Error broadcasting to user {user_id}: {e}")
                 disconnected_users.append(user_id)
@@ -83,8 +90,10 @@ class WebSocketManager:
     async def broadcast_to_symbol_subscribers(self, symbol: str, message: Dict[str, Any]):
         """Broadcast a message to all users subscribed to a specific symbol."""
         if symbol in self.symbol_subscriptions:
-            for user_id in self.symbol_subscriptions[symbol]:
-                await self.send_personal_message(message, user_id)
+            payload = json.dumps(message)
+            # Copy: a failed send disconnects the user and mutates the set
+            for user_id in list(self.symbol_subscriptions[symbol]):
+                await self.send_text_to_user(user_id, payload)
     
     async def handle_message(self, user_id: str, message: Dict[str, Any]):
         """Handle incoming WebSocket messages."""
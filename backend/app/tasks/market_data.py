@@ -20,12 +20,15 @@ def fetch_market_data():
         for asset in assets:
             try:
                 # Fetch current price
-                current_price = market_service._fetch_current_price_from_api(asset.symbol)
+                current_price = market_service._fetch_current_price_from_api(asset.symbol, flush=False)
                 if current_price:
                     logger.info(f"Updated price for {asset.symbol}: ${current_price}")
             except Exception as e:
                 logger.error(f"Error fetching data for {asset.symbol}: {e}")
         
+        # Write every fetched bar in one transaction
+        market_service.flush_prices()
+        
         logger.info(f"Market data fetch completed for {len(assets)} assets")
         
     except Exception as e:
@@ -33,6 +36,45 @@ def fetch_market_data():
     finally:
         db.close()
 
+@shared_task
+def precompute_chart_patterns():
+    """Refresh cached chart patterns for every watched symbol"""
+    db = SessionLocal()
+    try:
+        from app.db.models import Watchlist
+        from app.services.interactive_charts_service import InteractiveChartsService
+        
+        charts_service = InteractiveChartsService(db)
+        symbols = [row.symbol for row in db.query(Watchlist.symbol).distinct()]
+        
+        refreshed = 0
+        for symbol in symbols:
+            try:
+                if charts_service.refresh_chart_patterns(symbol):
+                    refreshed += 1
+            except Exception as e:
+                logger.error(f"Error precomputing chart patterns for {symbol}: {e}")
+        
+        logger.info(f"Chart patterns refreshed for {refreshed}/{len(symbols)} watched symbols")
+        
+    except Exception as e:
+        logger.error(f"Error in precompute_chart_patterns task: {e}")
+    finally:
+        db.close()
+
+@shared_task
+def rebuild_latest_prices():
+    """Recompute the latest_prices rollup from the full prices table"""
+    db = SessionLocal()
+    try:
+        rows = MarketDataService(db).rebuild_latest_prices()
+        logger.info(f"Latest price rollup rebuilt for {rows} assets")
+        
+    except Exception as e:
+        logger.error(f"Error in rebuild_latest_prices task: {e}")
+    finally:
+        db.close()
+
 @shared_task
 def update_portfolio_values():
     """Update portfolio values based on current market prices"""
@@ -1,7 +1,8 @@
 import pytest
 import asyncio
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 import tempfile
@@ -45,6 +46,24 @@ def db_session():
         # Drop tables
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def count_queries():
+    """Collect the SQL statements run inside a `with count_queries() as queries:` block."""
+    @contextmanager
+    def counter():
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    
+    return counter
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with database session override."""
@@ -205,7 +224,7 @@ def test_social_post(db_session, test_user):
         content="Test post content",
         post_type="general",
         symbol="AAPL",
-        tags='["test", "trading"]',
+        tags=["test", "trading"],
         likes_count=0,
         comments_count=0,
         shares_count=0,
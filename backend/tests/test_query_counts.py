@@ -0,0 +1,101 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.services.market_screener_service import MarketScreenerService
+
+@pytest.fixture
+def screener_market(db_session):
+    """Create a handful of stocks with two bars each and their latest-price rollup."""
+    now = datetime.utcnow()
+    closes = {
+        "AAPL": (150.0, 154.0),
+        "MSFT": (300.0, 294.0),
+        "GOOGL": (130.0, 131.5),
+        "AMZN": (140.0, 140.0),
+        "NVDA": (450.0, 432.0),
+    }
+    
+    for symbol, (previous_close, close) in closes.items():
+        asset = models.Asset(
+            symbol=symbol,
+            name=f"{symbol} Inc.",
+            asset_type="stock",
+            exchange="NASDAQ",
+            sector="Technology"
+        )
+        db_session.add(asset)
+        db_session.flush()
+        
+        for offset, price in ((1, previous_close), (0, close)):
+            db_session.add(models.Price(
+                asset_id=asset.id,
+                timestamp=now - timedelta(days=offset),
+                open_price=price,
+                high_price=price,
+                low_price=price,
+                close_price=price,
+                volume=1000000
+            ))
+        db_session.add(models.LatestPrice(
+            asset_id=asset.id,
+            timestamp=now,
+            close_price=close,
+            previous_close=previous_close,
+            volume=1000000
+        ))
+    
+    db_session.commit()
+    return closes
+
+class TestScreenerQueryCounts:
+    """Guard the screener against N+1 query regressions."""
+    
+    def test_top_gainers_query_budget(self, db_session: Session, screener_market, count_queries):
+        """Top gainers are ranked in a single query."""
+        service = MarketScreenerService(db_session)
+        with count_queries() as queries:
+            gainers = service.get_top_gainers(limit=10)
+        
+        assert [gainer["symbol"] for gainer in gainers] == ["AAPL", "GOOGL"]
+        assert len(queries) <= 2
+    
+    def test_top_losers_query_budget(self, db_session: Session, screener_market, count_queries):
+        """Top losers are ranked in a single query."""
+        service = MarketScreenerService(db_session)
+        with count_queries() as queries:
+            losers = service.get_top_losers(limit=10)
+        
+        assert [loser["symbol"] for loser in losers] == ["NVDA", "MSFT"]
+        assert len(queries) <= 2
+    
+    def test_sector_performance_query_budget(self, db_session: Session, screener_market, count_queries):
+        """Sector performance is aggregated in SQL."""
+        service = MarketScreenerService(db_session)
+        with count_queries() as queries:
+            sectors = service.get_sector_performance()
+        
+        assert [sector["sector"] for sector in sectors] == ["Technology"]
+        assert sectors[0]["stocks"] == len(screener_market)
+        assert len(queries) <= 1
+    
+    def test_market_overview_query_budget(self, db_session: Session, screener_market, count_queries):
+        """Market overview counts stocks and buckets their direction in two queries."""
+        service = MarketScreenerService(db_session)
+        with count_queries() as queries:
+            overview = service.get_market_overview()
+        
+        assert overview["advancing_stocks"] == 2
+        assert overview["declining_stocks"] == 2
+        assert overview["unchanged_stocks"] == 1
+        assert len(queries) <= 2
+    
+    def test_screen_stocks_query_budget(self, db_session: Session, screener_market, count_queries):
+        """Screening prices every result in one batch instead of per stock."""
+        service = MarketScreenerService(db_session)
+        with count_queries() as queries:
+            results = service.screen_stocks({"sector": "Technology"})
+        
+        assert {result["symbol"] for result in results} == set(screener_market)
+        assert len(queries) <= 3
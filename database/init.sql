@@ -1,5 +1,8 @@
 -- Initialize TimescaleDB extension
 CREATE EXTENSION IF NOT EXISTS timescaledb;
 
+-- Initialize trigram extension for asset search indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Note: Tables will be created by SQLAlchemy models
 -- Additional indexes will be created after tables are populated
@@ -4,6 +4,9 @@
 -- Create TimescaleDB extension
 CREATE EXTENSION IF NOT EXISTS timescaledb;
 
+-- Create trigram extension for substring search indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create custom types
 DO $$ BEGIN
     CREATE TYPE order_status AS ENUM ('pending', 'filled', 'cancelled', 'rejected');
@@ -32,6 +35,8 @@ END $$;
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_prices_symbol_timestamp ON prices (symbol, timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_prices_timestamp ON prices (timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_prices_asset_timestamp_desc ON prices (asset_id, timestamp DESC) INCLUDE (close_price, volume);
+DROP INDEX IF EXISTS idx_prices_asset_timestamp;
 CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_symbol ON transactions (symbol);
 CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp DESC);
@@ -82,6 +87,30 @@ CREATE INDEX IF NOT EXISTS idx_advanced_orders_user_symbol ON advanced_orders (u
 CREATE INDEX IF NOT EXISTS idx_ml_models_user_symbol ON ml_models (user_id, symbol);
 CREATE INDEX IF NOT EXISTS idx_social_posts_user_created ON social_posts (user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_social_posts_symbol_created ON social_posts (symbol, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_social_posts_feed_id ON social_posts (user_id, is_public, created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_social_posts_feed;
+CREATE INDEX IF NOT EXISTS idx_social_comments_post_created ON social_comments (post_id, created_at DESC);
+
+-- Create trigram indexes for substring search
+CREATE INDEX IF NOT EXISTS idx_assets_symbol_name_trgm ON assets USING GIN (symbol gin_trgm_ops, name gin_trgm_ops);
+
+-- Create expression indexes for computed orderings
+ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS views_count INTEGER DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_social_posts_engagement ON social_posts ((likes_count * 2 + comments_count * 3 + shares_count * 5 + views_count * 0.1) DESC);
+
+-- Bring social_posts in line with the JSON list columns (tags held JSON text before)
+ALTER TABLE social_posts ALTER COLUMN tags TYPE JSONB USING tags::jsonb;
+ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS mentions JSONB NOT NULL DEFAULT '[]'::jsonb;
+ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS hashtags JSONB NOT NULL DEFAULT '[]'::jsonb;
+ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS images JSONB NOT NULL DEFAULT '[]'::jsonb;
+
+-- Create chat history index for keyset pagination (only once the chat tables exist)
+DO $$
+BEGIN
+    IF to_regclass('public.chat_messages') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_room_created ON chat_messages (room_id, created_at DESC, id DESC);
+    END IF;
+END $$;
 
 -- Create partial indexes for active records
 CREATE INDEX IF NOT EXISTS idx_price_alerts_active ON price_alerts (user_id, symbol) WHERE is_active = true;